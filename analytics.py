@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from progress_events import EVENT_TYPES
+
+# How often the admin page may check whether progress changed, in seconds;
+# loading 100k users takes long enough that a busy round shouldn't redo it
+# on every rerun
+REFRESH_SECONDS = float(os.getenv("CYBERWOLF_ANALYTICS_REFRESH", "30"))
+
+HEALTH_BINS = np.arange(0, 111, 10)
+HINT_BUCKETS = ("0 hints", "1 hint", "2 hints", "3+ hints")
+
+class ProgressFrame:
+    """
+    Columnar copy of every user's progress and the event history at one
+    store version. `completed` is a users x challenges boolean matrix
+    unpacked from the stored bitmasks.
+    """
+    __slots__ = ('version', 'generation', 'users', 'completed', 'events', 'built_at', 'build_seconds')
+    
+    def __init__(self, version, generation, users, completed, events, built_at, build_seconds):
+        self.version = version
+        self.generation = generation
+        self.users = users
+        self.completed = completed
+        self.events = events
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+def build_frame(user_columns, event_columns, num_challenges):
+    """
+    (users DataFrame, completed matrix, events DataFrame) from the lists
+    returned by Database.export_columns / export_event_columns
+    """
+    emails = user_columns['email']
+    masks = np.asarray(user_columns['completed_mask'], dtype=np.int64)
+    # Bit n of the mask is challenge n; one shift per challenge for all users at once
+    completed = ((masks[:, None] >> np.arange(1, num_challenges + 1)) & 1).astype(bool)
+    
+    users = pd.DataFrame({
+        'email': pd.Series(emails, dtype=object),
+        # Parsing strings is the one per-user step; as a categorical, cohort
+        # filters compare integer codes
+        'domain': pd.Categorical([email.rpartition('@')[2].lower() for email in emails]),
+        'health_score': _numbers(user_columns['health_score'], 0),
+        'current_challenge': _numbers(user_columns['current_challenge'], 1),
+        'user_score': _numbers(user_columns['user_score'], 0),
+        'completed': completed.sum(axis=1),
+        'last_updated': pd.to_datetime(pd.Series(user_columns['last_updated'], dtype=object), errors='coerce')
+    })
+    
+    # Events refer to users by row position (-1 for users no longer stored),
+    # so per-user counts are a bincount and cohort filters an array lookup
+    positions = pd.Index(users['email']).get_indexer(pd.Series(event_columns['email'], dtype=object))
+    events = pd.DataFrame({
+        'type': pd.Categorical(event_columns['type'], categories=EVENT_TYPES),
+        'user': positions,
+        'challenge': _numbers(event_columns['challenge'], 0),
+        'ts': (np.asarray(event_columns['ts'], dtype=np.float64) * 1e9).astype('datetime64[ns]'),
+        'amount': _numbers(event_columns['amount'], 0)
+    })
+    return users, completed, events
+
+def _numbers(values, missing):
+    # Stored fields may be None (e.g. user_score after a reset)
+    return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').fillna(missing).to_numpy(np.int64)
+
+def cohorts(frame, limit=25):
+    """
+    The largest email domains, for the cohort selector
+    """
+    return frame.users['domain'].value_counts().index[:limit].tolist()
+
+def summarize(frame, cohort=None):
+    """
+    All admin page aggregates for one cohort (an email domain, or everyone)
+    """
+    users = frame.users
+    completed = frame.completed
+    events = frame.events
+    event_users = events['user'].to_numpy()
+    known = event_users >= 0
+    if cohort is not None:
+        selected = (users['domain'] == cohort).to_numpy()
+        users = users[selected]
+        completed = completed[selected]
+        known &= selected[event_users]
+        # Renumber the cohort's users 0..len-1 for the per-user counts below
+        event_users = (np.cumsum(selected) - 1)[event_users]
+    events = events[known]
+    event_users = event_users[known]
+    num_challenges = completed.shape[1]
+    agents = len(users)
+    
+    counts, _ = np.histogram(users['health_score'].to_numpy(), bins=HEALTH_BINS)
+    health = pd.DataFrame(
+        {'agents': counts},
+        index=[f"{low}-{low + 9}" if low < 100 else "100" for low in HEALTH_BINS[:-1]]
+    )
+    
+    # Solved: completed the challenge; reached: unlocked it
+    reached = users['current_challenge'].to_numpy()[:, None] >= np.arange(1, num_challenges + 1)
+    funnel = pd.DataFrame(
+        {'reached': reached.sum(axis=0), 'solved': completed.sum(axis=0)},
+        index=[f"C{n}" for n in range(1, num_challenges + 1)]
+    )
+    
+    # Hints and penalties per user in the cohort
+    types = events['type'].to_numpy()
+    per_user = pd.DataFrame({
+        'hints': np.bincount(event_users[types == 'hint'], minlength=agents),
+        'penalties': np.bincount(event_users[types == 'penalty'], minlength=agents),
+        'completed': users['completed'].to_numpy(),
+        'health_score': users['health_score'].to_numpy()
+    })
+    per_user['hint_bucket'] = pd.Categorical.from_codes(np.minimum(per_user['hints'].to_numpy(), 3), HINT_BUCKETS)
+    impact = per_user.groupby('hint_bucket', observed=False).agg(
+        agents=('completed', 'size'),
+        avg_completed=('completed', 'mean'),
+        avg_health=('health_score', 'mean'),
+        avg_penalties=('penalties', 'mean')
+    ).round(2)
+    
+    solves = events.loc[events['type'] == 'solve', 'ts']
+    if len(solves):
+        progress = solves.dt.floor('15min').value_counts().sort_index().cumsum().to_frame('solves')
+    else:
+        progress = pd.DataFrame({'solves': []})
+    
+    return {
+        'agents': agents,
+        'mean_health': float(users['health_score'].mean()) if agents else 0.0,
+        'median_completed': float(users['completed'].median()) if agents else 0.0,
+        'finished': int((users['completed'] >= num_challenges).sum()),
+        'health_distribution': health,
+        'funnel': funnel,
+        'hint_impact': impact,
+        'progress': progress
+    }
+
+class AnalyticsCache:
+    """
+    Process-wide ProgressFrame plus per-cohort summaries.
+    
+    The store's and the event history's versions are checked at most every
+    `refresh` seconds, and the columns are reloaded only when either changed;
+    summaries are computed once per frame and cohort.
+    """
+    def __init__(self, db, num_challenges, refresh=REFRESH_SECONDS):
+        self.db = db
+        self.num_challenges = num_challenges
+        self.refresh = refresh
+        self._frame = None
+        self._summaries = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'frame_builds': 0, 'summaries': 0}
+        metrics.register_stats("analytics", self.get_stats, gauges=('generation', 'users', 'build_seconds'))
+    
+    def frame(self):
+        frame = self._frame
+        if frame is not None and time.monotonic() - self._checked_at < self.refresh:
+            return frame
+        
+        # One admin reloads while any others keep the current frame
+        if not self._lock.acquire(blocking=frame is None):
+            return frame
+        try:
+            if self._frame is not None and time.monotonic() - self._checked_at < self.refresh:
+                return self._frame
+            self._checked_at = time.monotonic()
+            # Not every event comes with a progress save, so both are compared
+            version = [self.db.get_version(), self.db.get_events_version()]
+            if None in version:
+                version = None
+            if self._frame is not None and version is not None and version == self._frame.version:
+                return self._frame
+            
+            started = time.perf_counter()
+            user_columns = self.db.export_columns()
+            event_columns = self.db.export_event_columns()
+            if user_columns is None or event_columns is None:
+                return self._frame
+            users, completed, events = build_frame(user_columns, event_columns, self.num_challenges)
+            generation = self._frame.generation + 1 if self._frame is not None else 1
+            self._frame = ProgressFrame(version, generation, users, completed, events,
+                                        time.time(), time.perf_counter() - started)
+            self._summaries = {}
+            self._stats['frame_builds'] += 1
+            return self._frame
+        finally:
+            self._lock.release()
+    
+    def summary(self, cohort=None):
+        frame = self.frame()
+        if frame is None:
+            return None
+        key = (frame.generation, cohort)
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = summarize(frame, cohort)
+            self._stats['summaries'] += 1
+        return summary
+    
+    def get_stats(self):
+        stats = dict(self._stats)
+        frame = self._frame
+        stats['generation'] = frame.generation if frame is not None else 0
+        stats['users'] = len(frame.users) if frame is not None else 0
+        stats['build_seconds'] = frame.build_seconds if frame is not None else 0.0
+        return stats
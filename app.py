@@ -2,29 +2,62 @@ import streamlit as st
 import json
 import os
 from datetime import datetime
+from html import escape
 from firebase_auth import FirebaseAuth
 from wolf_ai import WolfAI
 from challenges import ChallengeManager
-from database import Database
+from database import CorruptDataError, open_database
 from styles import apply_custom_styles
+from leaderboard_snapshot import LeaderboardCache, REFRESH_SECONDS
+from leaderboard_export import ranked_rows
+import session_persistence
+import submissions
+import metrics
+import profiling
+
+# Dev mode reloads challenge code and clears Streamlit's caches on every run so
+# edits show up immediately; production builds the components once per process
+DEV_MODE = os.getenv("CYBERWOLF_DEV_MODE", "0") == "1"
+
+# Emails allowed to open the analytics dashboard (?view=admin), comma-separated
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("CYBERWOLF_ADMIN_EMAILS", "").split(",") if email.strip()}
 
 # Initialize components
+@st.cache_resource
+def _shared_components():
+    # None of these hold per-user state, so every session can share them
+    firebase_auth = metrics.instrument(FirebaseAuth(), "firebase_auth", methods=('authenticate_user',))
+    wolf_ai = metrics.instrument(WolfAI(), "wolf_ai", methods=('get_hint',))
+    challenge_manager = ChallengeManager()
+    database = metrics.instrument(open_database(), "database")
+    return firebase_auth, wolf_ai, challenge_manager, database
+
+@metrics.timed("init_components")
 def init_components():
+    if not DEV_MODE:
+        return _shared_components()
+    
     # Reload modules to ensure latest code
     import importlib
     import challenges
     importlib.reload(challenges)
     
-    firebase_auth = FirebaseAuth()
-    wolf_ai = WolfAI()
+    firebase_auth = metrics.instrument(FirebaseAuth(), "firebase_auth", methods=('authenticate_user',))
+    wolf_ai = metrics.instrument(WolfAI(), "wolf_ai", methods=('get_hint',))
     challenge_manager = challenges.ChallengeManager()
-    database = Database()
+    database = metrics.instrument(open_database(), "database")
     return firebase_auth, wolf_ai, challenge_manager, database
 
+# Time spent per rerun, with the slow parts broken out as spans of their own;
+# exported as configured by the environment (see metrics.start_exporter)
+@metrics.timed("rerun")
 def main():
-    # Clear cache to ensure latest code is loaded
-    st.cache_data.clear()
-    st.cache_resource.clear()
+    metrics.start_exporter()
+    
+    if DEV_MODE:
+        # Clear cache to ensure latest code is loaded
+        st.cache_data.clear()
+        st.cache_resource.clear()
     
     st.set_page_config(
         page_title="CYBERWOLF - Cybersecurity CTF",
@@ -33,7 +66,8 @@ def main():
     )
     
     # Apply custom styles
-    apply_custom_styles()
+    with metrics.span("apply_custom_styles"):
+        apply_custom_styles()
     
     # Initialize components
     firebase_auth, wolf_ai, challenge_manager, db = init_components()
@@ -58,11 +92,24 @@ def main():
     if 'user_score' not in st.session_state:
         st.session_state.user_score = 0
     
+    # Spectator view for projectors: no login, refreshes itself
+    if st.query_params.get("view") == "leaderboard":
+        show_leaderboard_page(db)
+        return
+    
+    # Organizers' dashboard; logging in from here lands back on it
+    if st.query_params.get("view") == "admin" and st.session_state.authenticated:
+        show_admin_page(challenge_manager, db)
+        return
+    
     # Authentication flow
     if not st.session_state.authenticated:
         show_login_page(firebase_auth, db)
     else:
         show_main_game(wolf_ai, challenge_manager, db)
+    
+    # Persist whatever handlers changed during this run, once
+    session_persistence.flush(db)
 
 def show_login_page(firebase_auth, db):
     st.markdown("""
@@ -86,27 +133,137 @@ def show_login_page(firebase_auth, db):
                 try:
                     user = firebase_auth.authenticate_user(email, password)
                     if user:
+                        # Load user data first: if the store is damaged, the
+                        # agent must not start over and overwrite it on the next save
+                        user_data = session_persistence.load(db, email)
                         st.session_state.authenticated = True
                         st.session_state.user_email = email
                         
-                        # Load user data
-                        user_data = db.get_user_data(email)
                         if user_data:
                             st.session_state.health_score = user_data.get('health_score', 100)
                             st.session_state.completed_challenges = set(user_data.get('completed_challenges', []))
                             st.session_state.current_challenge = user_data.get('current_challenge', 1)
                             st.session_state.user_score = user_data.get('user_score', 0)
+                            session_persistence.mark_clean()
                         
                         st.success("Welcome to the Matrix, Agent!")
                         st.rerun()
                     else:
                         st.error("Invalid credentials. Access denied.")
+                except CorruptDataError as e:
+                    print(f"Error loading progress for {email}: {e}")
+                    st.error("Your saved progress could not be read. Login is blocked so it isn't overwritten; please tell the organizers.")
                 except Exception as e:
                     st.error(f"Authentication failed: {str(e)}")
             else:
                 st.warning("Please enter both email and password")
         
         st.markdown('</div>', unsafe_allow_html=True)
+        st.markdown('<a href="?view=leaderboard" target="_blank">🏆 View the live leaderboard</a>', unsafe_allow_html=True)
+
+@st.cache_resource
+def leaderboard_cache(_db):
+    # One snapshot per process, shared by every viewer
+    return LeaderboardCache(_db, render_leaderboard_html)
+
+def show_leaderboard_page(db):
+    st.markdown("""
+    <div class="game-header">
+        <h1 class="neon-title">CYBERWOLF</h1>
+        <h3 class="subtitle">LIVE LEADERBOARD</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    show_live_leaderboard(db)
+
+# Only the table reruns on the timer; between store changes every viewer is
+# handed the same prebuilt markup
+@st.fragment(run_every=REFRESH_SECONDS)
+def show_live_leaderboard(db):
+    snapshot = leaderboard_cache(db).get()
+    st.markdown(snapshot.html, unsafe_allow_html=True)
+    st.caption(f"Updated {datetime.fromtimestamp(snapshot.built_at):%H:%M:%S}")
+
+def render_leaderboard_html(rows):
+    if not rows:
+        return '<p class="description">No agents on the board yet.</p>'
+    
+    body = []
+    # Same ranks (ties shared) as the CSV/JSON export
+    for row in ranked_rows(rows):
+        rank = row['rank']
+        # Show the part before the @ only; the board is on public screens
+        agent = escape(row['email'].split('@')[0])
+        podium = ' class="podium"' if rank <= 3 else ''
+        body.append(
+            f"<tr{podium}><td>#{rank}</td><td>{agent}</td>"
+            f"<td>{row['completed_challenges']}/10</td><td>{row['health_score']}</td></tr>"
+        )
+    
+    return (
+        '<table class="leaderboard-table">'
+        '<tr><th>Rank</th><th>Agent</th><th>Challenges</th><th>Health</th></tr>'
+        + "".join(body) +
+        '</table>'
+    )
+
+@st.cache_resource
+def analytics_cache(_db, num_challenges):
+    # One columnar copy of the progress data per process, shared by every admin.
+    # Imported here so numpy/pandas load only when the dashboard is first used,
+    # not on every worker's cold start
+    import analytics
+    return analytics.AnalyticsCache(_db, num_challenges)
+
+def show_admin_page(challenge_manager, db):
+    st.markdown("""
+    <div class="game-header">
+        <h1 class="neon-title">CYBERWOLF</h1>
+        <h3 class="subtitle">ROUND ANALYTICS</h3>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    if (st.session_state.user_email or "").lower() not in ADMIN_EMAILS:
+        st.error("Access denied. The analytics dashboard is for organizers only.")
+        return
+    
+    cache = analytics_cache(db, len(challenge_manager.get_all_challenges()))
+    frame = cache.frame()
+    if frame is None:
+        st.error("Progress data is unavailable right now.")
+        return
+    
+    import analytics
+    cohort = st.selectbox("Cohort", ["All agents"] + analytics.cohorts(frame), key="admin_cohort")
+    summary = cache.summary(None if cohort == "All agents" else cohort)
+    
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Agents", f"{summary['agents']:,}")
+    col2.metric("Mean health", f"{summary['mean_health']:.1f}")
+    col3.metric("Median solved", f"{summary['median_completed']:g}")
+    col4.metric("Finished", f"{summary['finished']:,}")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Health score distribution")
+        st.bar_chart(summary['health_distribution'])
+    with col2:
+        st.markdown("#### Completion funnel")
+        st.bar_chart(summary['funnel'], stack=False)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("#### Hint penalty impact")
+        st.dataframe(summary['hint_impact'])
+    with col2:
+        st.markdown("#### Challenges solved over time")
+        st.line_chart(summary['progress'])
+    
+    st.caption(
+        f"Data as of {datetime.fromtimestamp(frame.built_at):%H:%M:%S} "
+        f"(load #{frame.generation}, {frame.build_seconds:.1f}s); "
+        f"rechecked at most every {cache.refresh:.0f}s"
+    )
 
 def show_main_game(wolf_ai, challenge_manager, db):
     # Header
@@ -131,12 +288,8 @@ def show_main_game(wolf_ai, challenge_manager, db):
     with col3:
         if st.button("LOGOUT", type="secondary"):
             # Save user data before logout
-            db.save_user_data(
-                st.session_state.user_email,
-                st.session_state.health_score,
-                list(st.session_state.completed_challenges),
-                st.session_state.current_challenge
-            )
+            session_persistence.mark_dirty()
+            session_persistence.flush(db, wait=True)
             
             # Reset session
             for key in list(st.session_state.keys()):
@@ -246,11 +399,20 @@ def show_main_game(wolf_ai, challenge_manager, db):
         """)
     
     # Challenge selection
+    show_challenge_grid(wolf_ai, challenge_manager, db)
+
+# Opening a challenge reruns only the grid, not the header, dashboard and tips;
+# the detail dialog is itself a fragment, and handlers there trigger a full
+# rerun only when progress changed (see session_persistence.rerun)
+@st.fragment
+@metrics.timed("challenge_grid")
+def show_challenge_grid(wolf_ai, challenge_manager, db):
     st.markdown('<div class="challenges-container">', unsafe_allow_html=True)
     st.markdown("## CYBERSECURITY CHALLENGES")
     
     # Create challenge grid
     challenges = challenge_manager.get_all_challenges()
+    cards = card_html_table(challenge_manager.catalog_version, challenges)
     
     for i in range(0, len(challenges), 2):
         col1, col2 = st.columns(2)
@@ -261,14 +423,11 @@ def show_main_game(wolf_ai, challenge_manager, db):
                 challenge_num = i + j + 1
                 
                 with col:
-                    show_challenge_card(challenge, challenge_num, wolf_ai, challenge_manager, db)
+                    show_challenge_card(challenge, challenge_num, wolf_ai, challenge_manager, db, cards)
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def show_challenge_card(challenge, challenge_num, wolf_ai, challenge_manager, db):
-    is_completed = challenge_num in st.session_state.completed_challenges
-    is_locked = challenge_num > st.session_state.current_challenge
-    
+def render_card_html(challenge, challenge_num, status):
     # Determine card style based on difficulty
     if challenge['difficulty'] == 'Easy':
         card_class = "challenge-card-easy"
@@ -277,26 +436,50 @@ def show_challenge_card(challenge, challenge_num, wolf_ai, challenge_manager, db
     else:
         card_class = "challenge-card-hard"
     
-    if is_completed:
+    if status == 'Completed':
         card_class += " completed"
-    elif is_locked:
+    elif status == 'Locked':
         card_class += " locked"
     
-    st.markdown(f"""
+    return f"""
     <div class="{card_class}">
         <h4>Challenge {challenge_num}: {challenge['title']}</h4>
         <p><strong>Difficulty:</strong> {challenge['difficulty']}</p>
         <p>{challenge['description'][:100]}...</p>
         <div class="challenge-status">
-            {'Completed' if is_completed else 'Locked' if is_locked else 'Available'}
+            {status}
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+@st.cache_resource(max_entries=4)
+def card_html_table(catalog_version, _challenges):
+    """
+    Markup for every card in each of its three states, built once per catalog
+    version (the unhashed _challenges is identified by catalog_version). Fetch
+    it once per grid render: each cache lookup costs more than a card's f-string.
+    """
+    return {
+        challenge_num: {
+            status: render_card_html(challenge, challenge_num, status)
+            for status in ('Available', 'Completed', 'Locked')
+        }
+        for challenge_num, challenge in enumerate(_challenges, 1)
+    }
+
+def show_challenge_card(challenge, challenge_num, wolf_ai, challenge_manager, db, cards):
+    is_completed = challenge_num in st.session_state.completed_challenges
+    is_locked = challenge_num > st.session_state.current_challenge
+    status = 'Completed' if is_completed else 'Locked' if is_locked else 'Available'
+    
+    st.markdown(cards[challenge_num][status], unsafe_allow_html=True)
     
     if not is_locked:
         if st.button(f"{'Review' if is_completed else 'Start'} Challenge {challenge_num}", 
                     key=f"challenge_{challenge_num}", 
                     disabled=is_locked):
+            if not is_completed:
+                db.record_event(st.session_state.user_email, 'start', challenge_num)
             show_challenge_detail(challenge, challenge_num, wolf_ai, challenge_manager, db)
 
 @st.dialog("Challenge Details")
@@ -339,16 +522,12 @@ def show_challenge_detail(challenge, challenge_num, wolf_ai, challenge_manager,
                 
                 # Reduce health score
                 st.session_state.health_score -= 10
+                db.record_event(st.session_state.user_email, 'hint', challenge_num, 10)
                 st.warning("Health score reduced by 10 points for using hint!")
                 
                 # Save updated health score
-                db.save_user_data(
-                    st.session_state.user_email,
-                    st.session_state.health_score,
-                    list(st.session_state.completed_challenges),
-                    st.session_state.current_challenge
-                )
-                st.rerun()
+                session_persistence.mark_dirty()
+                session_persistence.rerun(db)
             else:
                 st.error("Insufficient health score for hints!")
     
@@ -376,7 +555,8 @@ def show_challenge_detail(challenge, challenge_num, wolf_ai, challenge_manager,
                 st.session_state.hint_active = False
                 st.session_state.current_hint = None
                 st.session_state.current_hint_challenge = None
-                st.rerun()
+                # Closing a hint changes nothing outside this dialog
+                st.rerun(scope="fragment")
     
     with col2:
         st.markdown(f"""
@@ -386,273 +566,11 @@ def show_challenge_detail(challenge, challenge_num, wolf_ai, challenge_manager,
         </div>
         """, unsafe_allow_html=True)
     
-    # Challenge-specific interface
-    if challenge_num == 1:
-        show_challenge_1_interface(challenge_manager, db)
-    elif challenge_num == 2:
-        show_challenge_2_interface(challenge_manager, db)
-    elif challenge_num == 3:
-        show_challenge_3_interface(challenge_manager, db)
-    else:
-        show_generic_challenge_interface(challenge_num, challenge_manager, db)
-
-def show_challenge_1_interface(challenge_manager, db):
-    st.markdown("## Submit your .pcap file")
-    
-    # Check if challenge is already completed
-    if 1 in st.session_state.completed_challenges:
-        st.markdown("""
-        <div style="background-color: rgba(255, 235, 59, 0.3); padding: 1rem; border-radius: 0; border: 4px solid #000000; margin: 1rem 0; box-shadow: 4px 4px 0px #000000;">
-            <h4 style="color: #000000; font-weight: 800; text-transform: uppercase;">SECURITY VIOLATION DETECTED</h4>
-            <p>Challenge 1 has already been completed! Attempting to redo completed challenges is prohibited.</p>
-            <p><strong>Penalty Applied:</strong> -15 Health Points</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if st.button("ACKNOWLEDGE VIOLATION", key="ack_violation_1"):
-            # Apply penalty
-            st.session_state.health_score = max(0, st.session_state.health_score - 15)
-            
-            # Save updated data
-            db.save_user_data(
-                st.session_state.user_email,
-                st.session_state.health_score,
-                list(st.session_state.completed_challenges),
-                st.session_state.current_challenge
-            )
-            
-            st.error(f"Security violation recorded! Health reduced to {st.session_state.health_score}/100")
-            st.info("Focus on completing available challenges instead!")
-            st.rerun()
-        return
-    
-    uploaded_file = st.file_uploader(
-        "Upload Wireshark capture file",
-        type=['pcap', 'pcapng'],
-        key="challenge1_upload"
-    )
-    
-    # Only show flag input if all challenges are completed
-    all_challenges_completed = len(st.session_state.completed_challenges) >= 10
-    
-    if all_challenges_completed:
-        flag_input = st.text_input(
-            "Enter Flag (Optional)",
-            placeholder="WOLF{...}",
-            key="challenge1_flag"
-        )
-    else:
-        flag_input = None
-    
-    # Create columns for buttons
-    col1, col2 = st.columns([1, 1])
-    
-    if uploaded_file is not None:
-        st.success(f"File uploaded: {uploaded_file.name}")
-    
-    with col1:
-        if st.button("Submit Challenge 1", key="submit_challenge_1"):
-            is_correct = challenge_manager.validate_challenge_1(uploaded_file, flag_input)
-            
-            if is_correct:
-                st.success("Challenge 1 completed! Great work on capturing network traffic!")
-                st.session_state.completed_challenges.add(1)
-                st.session_state.current_challenge = max(st.session_state.current_challenge, 2)
-                
-                # Add 5 points for completing the challenge
-                if 1 not in st.session_state.completed_challenges:
-                    st.session_state.user_score += 5
-                    st.info(f"🎯 +5 points! Total score: {st.session_state.user_score}")
-                
-                # Save progress
-                db.save_user_data(
-                    st.session_state.user_email,
-                    st.session_state.health_score,
-                    list(st.session_state.completed_challenges),
-                    st.session_state.current_challenge,
-                    st.session_state.user_score
-                )
-                st.rerun()
-            else:
-                st.error("Invalid file or incorrect format. Try again!")
-    
-    with col2:
-        if st.button("Submit Problem Report", key="submit_problem_1"):
-            st.info("Problem report submitted! Our security team will review it within 24 hours.")
-
-def show_challenge_2_interface(challenge_manager, db):
-    st.markdown("## Web Analysis Task")
-    
-    # Check if challenge is already completed
-    if 2 in st.session_state.completed_challenges:
-        st.markdown("""
-        <div style="background-color: rgba(255, 235, 59, 0.3); padding: 1rem; border-radius: 0; border: 4px solid #000000; margin: 1rem 0; box-shadow: 4px 4px 0px #000000;">
-            <h4 style="color: #000000; font-weight: 800; text-transform: uppercase;">SECURITY VIOLATION DETECTED</h4>
-            <p>Challenge 2 has already been completed! Attempting to redo completed challenges is prohibited.</p>
-            <p><strong>Penalty Applied:</strong> -15 Health Points</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if st.button("ACKNOWLEDGE VIOLATION", key="ack_violation_2"):
-            # Apply penalty
-            st.session_state.health_score = max(0, st.session_state.health_score - 15)
-            
-            # Save updated data
-            db.save_user_data(
-                st.session_state.user_email,
-                st.session_state.health_score,
-                list(st.session_state.completed_challenges),
-                st.session_state.current_challenge
-            )
-            
-            st.error(f"Security violation recorded! Health reduced to {st.session_state.health_score}/100")
-            st.info("Focus on completing available challenges instead!")
-            st.rerun()
-        return
-    
-    target_url = st.text_input("Target Website URL", key="challenge2_url")
-    request_method = st.selectbox("HTTP Method", ["GET", "POST", "PUT", "DELETE"], key="challenge2_method")
-    headers_found = st.text_area("Headers Discovered", key="challenge2_headers")
-    
-    # Only show flag input if all challenges are completed
-    all_challenges_completed = len(st.session_state.completed_challenges) >= 10
-    
-    if all_challenges_completed:
-        flag_input = st.text_input(
-            "Enter Flag (Optional)",
-            placeholder="WOLF{...}",
-            key="challenge2_flag"
-        )
-    else:
-        flag_input = None
-    
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        if st.button("Submit Challenge 2", key="submit_challenge_2"):
-            is_correct = challenge_manager.validate_challenge_2(target_url, request_method, headers_found, flag_input)
-            
-            if is_correct:
-                st.success("Challenge 2 completed! Excellent web analysis skills!")
-                st.session_state.completed_challenges.add(2)
-                st.session_state.current_challenge = max(st.session_state.current_challenge, 3)
-                
-                # Add 5 points for completing the challenge
-                if 2 not in st.session_state.completed_challenges:
-                    st.session_state.user_score += 5
-                    st.info(f"🎯 +5 points! Total score: {st.session_state.user_score}")
-                
-                # Save progress
-                db.save_user_data(
-                    st.session_state.user_email,
-                    st.session_state.health_score,
-                    list(st.session_state.completed_challenges),
-                    st.session_state.current_challenge,
-                    st.session_state.user_score
-                )
-                st.rerun()
-            else:
-                st.error("Incorrect analysis. Check your methodology!")
-    
-    with col2:
-        if st.button("Submit Problem Report", key="submit_problem_2"):
-            st.info("Problem report submitted! Our security team will review it within 24 hours.")
-
-def show_challenge_3_interface(challenge_manager, db):
-    st.markdown("## API Security Implementation")
-    
-    # Check if challenge is already completed
-    if 3 in st.session_state.completed_challenges:
-        st.markdown("""
-        <div style="background-color: rgba(255, 235, 59, 0.3); padding: 1rem; border-radius: 0; border: 4px solid #000000; margin: 1rem 0; box-shadow: 4px 4px 0px #000000;">
-            <h4 style="color: #000000; font-weight: 800; text-transform: uppercase;">SECURITY VIOLATION DETECTED</h4>
-            <p>Challenge 3 has already been completed! Attempting to redo completed challenges is prohibited.</p>
-            <p><strong>Penalty Applied:</strong> -15 Health Points</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if st.button("ACKNOWLEDGE VIOLATION", key="ack_violation_3"):
-            # Apply penalty
-            st.session_state.health_score = max(0, st.session_state.health_score - 15)
-            
-            # Save updated data
-            db.save_user_data(
-                st.session_state.user_email,
-                st.session_state.health_score,
-                list(st.session_state.completed_challenges),
-                st.session_state.current_challenge
-            )
-            
-            st.error(f"Security violation recorded! Health reduced to {st.session_state.health_score}/100")
-            st.info("Focus on completing available challenges instead!")
-            st.rerun()
-        return
-    
-    api_code = st.text_area(
-        "Submit your secure API code",
-        height=200,
-        key="challenge3_code"
-    )
-    
-    security_measures = st.multiselect(
-        "Security measures implemented",
-        [
-            "Input Validation", "Authentication", "Rate Limiting", "HTTPS", 
-            "SQL Injection Prevention", "XSS Protection", "CSRF Protection",
-            "Content Security Policy", "Secure Headers", "Data Encryption",
-            "Session Management", "Access Control", "Audit Logging",
-            "Error Handling", "Input Sanitization", "API Versioning",
-            "CORS Configuration", "Security Testing", "Vulnerability Scanning"
-        ],
-        key="challenge3_security"
-    )
-    
-    # Only show flag input if all challenges are completed
-    all_challenges_completed = len(st.session_state.completed_challenges) >= 10
-    
-    if all_challenges_completed:
-        flag_input = st.text_input(
-            "Enter Flag (Optional)",
-            placeholder="WOLF{...}",
-            key="challenge3_flag"
-        )
-    else:
-        flag_input = None
-    
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        if st.button("Submit Challenge 3", key="submit_challenge_3"):
-            is_correct = challenge_manager.validate_challenge_3(api_code, security_measures, flag_input)
-            
-            if is_correct:
-                st.success("Challenge 3 completed! Your API security implementation is solid!")
-                st.session_state.completed_challenges.add(3)
-                st.session_state.current_challenge = max(st.session_state.current_challenge, 4)
-                
-                # Add 5 points for completing the challenge
-                if 3 not in st.session_state.completed_challenges:
-                    st.session_state.user_score += 5
-                    st.info(f"🎯 +5 points! Total score: {st.session_state.user_score}")
-                
-                # Save progress
-                db.save_user_data(
-                    st.session_state.user_email,
-                    st.session_state.health_score,
-                    list(st.session_state.completed_challenges),
-                    st.session_state.current_challenge,
-                    st.session_state.user_score
-                )
-                st.rerun()
-            else:
-                st.error("Security implementation needs improvement!")
-    
-    with col2:
-        if st.button("Submit Problem Report", key="submit_problem_3"):
-            st.info("Problem report submitted! Our security team will review it within 24 hours.")
+    show_submission_form(challenge_num, challenge_manager, db)
 
-def show_generic_challenge_interface(challenge_num, challenge_manager, db):
-    st.markdown("## Submit Your Solution")
+def show_submission_form(challenge_num, challenge_manager, db):
+    submission = challenge_manager.get_submission(challenge_num)
+    st.markdown(f"## {submission['heading']}")
     
     # Check if challenge is already completed
     if challenge_num in st.session_state.completed_challenges:
@@ -660,76 +578,55 @@ def show_generic_challenge_interface(challenge_num, challenge_manager, db):
         <div style="background-color: rgba(255, 235, 59, 0.3); padding: 1rem; border-radius: 0; border: 4px solid #000000; margin: 1rem 0; box-shadow: 4px 4px 0px #000000;">
             <h4 style="color: #000000; font-weight: 800; text-transform: uppercase;">SECURITY VIOLATION DETECTED</h4>
             <p>Challenge {challenge_num} has already been completed! Attempting to redo completed challenges is prohibited.</p>
-            <p><strong>Penalty Applied:</strong> -15 Health Points</p>
+            <p><strong>Penalty Applied:</strong> -{submissions.VIOLATION_PENALTY} Health Points</p>
         </div>
         """, unsafe_allow_html=True)
         
         if st.button("ACKNOWLEDGE VIOLATION", key=f"ack_violation_{challenge_num}"):
-            # Apply penalty
-            st.session_state.health_score = max(0, st.session_state.health_score - 15)
-            
-            # Save updated data
-            db.save_user_data(
-                st.session_state.user_email,
-                st.session_state.health_score,
-                list(st.session_state.completed_challenges),
-                st.session_state.current_challenge
-            )
-            
-            st.error(f"Security violation recorded! Health reduced to {st.session_state.health_score}/100")
+            health_score = submissions.acknowledge_violation(challenge_num, db)
+            st.error(f"Security violation recorded! Health reduced to {health_score}/100")
             st.info("Focus on completing available challenges instead!")
             st.rerun()
         return
     
-    solution = st.text_area(
-        f"Enter your solution for Challenge {challenge_num}",
-        height=150,
-        key=f"challenge{challenge_num}_solution"
-    )
+    values = {}
+    for field in submission['fields']:
+        widget = getattr(st, field['widget'])
+        values[field['name']] = widget(field['label'], key=field['key'], **field.get('params', {}))
     
     # Only show flag input if all challenges are completed
     all_challenges_completed = len(st.session_state.completed_challenges) >= 10
     
     if all_challenges_completed:
-        flag_input = st.text_input(
+        values['flag'] = st.text_input(
             "Enter Flag (Optional)",
             placeholder="WOLF{...}",
             key=f"challenge{challenge_num}_flag"
         )
     else:
-        flag_input = None
+        values['flag'] = None
     
     col1, col2 = st.columns([1, 1])
     
+    for field in submission['fields']:
+        if field['widget'] == 'file_uploader' and values[field['name']] is not None:
+            st.success(f"File uploaded: {values[field['name']].name}")
+    
     with col1:
         if st.button(f"Submit Challenge {challenge_num}", key=f"submit_challenge_{challenge_num}"):
-            is_correct = challenge_manager.validate_generic_challenge(challenge_num, solution, flag_input)
+            outcome = submissions.submit(challenge_manager, challenge_num, values, db)
             
-            if is_correct:
-                st.success(f"Challenge {challenge_num} completed!")
-                st.session_state.completed_challenges.add(challenge_num)
-                st.session_state.current_challenge = max(st.session_state.current_challenge, challenge_num + 1)
-                
-                # Add 5 points for completing the challenge
-                if challenge_num not in st.session_state.completed_challenges:
-                    st.session_state.user_score += 5
-                    st.info(f"🎯 +5 points! Total score: {st.session_state.user_score}")
-                
-                # Save progress
-                db.save_user_data(
-                    st.session_state.user_email,
-                    st.session_state.health_score,
-                    list(st.session_state.completed_challenges),
-                    st.session_state.current_challenge,
-                    st.session_state.user_score
-                )
+            if outcome == 'solved':
+                st.success(submission['success'])
+                st.info(f"🎯 +{submissions.SOLVE_POINTS} points! Total score: {st.session_state.user_score}")
                 st.rerun()
-            else:
-                st.error("Incorrect solution. Keep trying!")
+            elif outcome == 'rejected':
+                st.error(submission['failure'])
     
     with col2:
         if st.button("Submit Problem Report", key=f"submit_problem_{challenge_num}"):
             st.info("Problem report submitted! Our security team will review it within 24 hours.")
 
 if __name__ == "__main__":
-    main()
+    # Normally just main(); profiles it when asked to (see profiling.py)
+    profiling.run(main)
@@ -1,9 +1,85 @@
 import re
 import os
+import json
+import hashlib
+
+# How each challenge is submitted: the form fields shown in its dialog (each
+# rendered with st.<widget>(label, key=key, **params)) and a validator called
+# with the manager and the submitted values by field name, plus 'flag'.
+# Challenges without an entry get a free-text solution form, so adding one to
+# the catalog needs no UI code.
+SUBMISSIONS = {
+    1: {
+        'heading': "Submit your .pcap file",
+        'fields': [
+            {'name': 'uploaded_file', 'widget': 'file_uploader', 'label': "Upload Wireshark capture file",
+             'key': "challenge1_upload", 'params': {'type': ['pcap', 'pcapng']}}
+        ],
+        'validate': lambda manager, values: manager.validate_challenge_1(values['uploaded_file'], values['flag']),
+        'success': "Challenge 1 completed! Great work on capturing network traffic!",
+        'failure': "Invalid file or incorrect format. Try again!"
+    },
+    2: {
+        'heading': "Web Analysis Task",
+        'fields': [
+            {'name': 'target_url', 'widget': 'text_input', 'label': "Target Website URL", 'key': "challenge2_url"},
+            {'name': 'request_method', 'widget': 'selectbox', 'label': "HTTP Method", 'key': "challenge2_method",
+             'params': {'options': ["GET", "POST", "PUT", "DELETE"]}},
+            {'name': 'headers_found', 'widget': 'text_area', 'label': "Headers Discovered", 'key': "challenge2_headers"}
+        ],
+        'validate': lambda manager, values: manager.validate_challenge_2(
+            values['target_url'], values['request_method'], values['headers_found'], values['flag']
+        ),
+        'success': "Challenge 2 completed! Excellent web analysis skills!",
+        'failure': "Incorrect analysis. Check your methodology!"
+    },
+    3: {
+        'heading': "API Security Implementation",
+        'fields': [
+            {'name': 'api_code', 'widget': 'text_area', 'label': "Submit your secure API code",
+             'key': "challenge3_code", 'params': {'height': 200}},
+            {'name': 'security_measures', 'widget': 'multiselect', 'label': "Security measures implemented",
+             'key': "challenge3_security", 'params': {'options': [
+                 "Input Validation", "Authentication", "Rate Limiting", "HTTPS",
+                 "SQL Injection Prevention", "XSS Protection", "CSRF Protection",
+                 "Content Security Policy", "Secure Headers", "Data Encryption",
+                 "Session Management", "Access Control", "Audit Logging",
+                 "Error Handling", "Input Sanitization", "API Versioning",
+                 "CORS Configuration", "Security Testing", "Vulnerability Scanning"
+             ]}}
+        ],
+        'validate': lambda manager, values: manager.validate_challenge_3(
+            values['api_code'], values['security_measures'], values['flag']
+        ),
+        'success': "Challenge 3 completed! Your API security implementation is solid!",
+        'failure': "Security implementation needs improvement!"
+    }
+}
+
+def generic_submission(challenge_num):
+    """
+    Free-text solution form for challenges without their own SUBMISSIONS entry
+    """
+    return {
+        'heading': "Submit Your Solution",
+        'fields': [
+            {'name': 'solution', 'widget': 'text_area', 'label': f"Enter your solution for Challenge {challenge_num}",
+             'key': f"challenge{challenge_num}_solution", 'params': {'height': 150}}
+        ],
+        'validate': lambda manager, values: manager.validate_generic_challenge(
+            challenge_num, values['solution'], values['flag']
+        ),
+        'success': f"Challenge {challenge_num} completed!",
+        'failure': "Incorrect solution. Keep trying!"
+    }
 
 class ChallengeManager:
     def __init__(self):
         self.challenges = self._load_challenges()
+        # Changes whenever the catalog content does; keys caches derived from it
+        self.catalog_version = hashlib.sha1(
+            json.dumps(self.challenges, sort_keys=True).encode('utf-8')
+        ).hexdigest()
     
     def _load_challenges(self):
         """
@@ -180,6 +256,18 @@ class ChallengeManager:
             return self.challenges[challenge_num - 1]
         return None
     
+    def get_submission(self, challenge_num):
+        """
+        Submission form and validator for a challenge (see SUBMISSIONS)
+        """
+        return SUBMISSIONS.get(challenge_num) or generic_submission(challenge_num)
+    
+    def validate_submission(self, challenge_num, values):
+        """
+        Validate a challenge's submitted form values, keyed by field name
+        """
+        return bool(self.get_submission(challenge_num)['validate'](self, values))
+    
     def validate_challenge_1(self, uploaded_file, flag=None):
         """
         Validate Challenge 1: Wireshark packet capture
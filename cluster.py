@@ -0,0 +1,183 @@
+import argparse
+import asyncio
+import os
+import re
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import time
+from itertools import count
+
+# Cookie the proxy uses to pin a browser to one worker
+STICKY_COOKIE = "cyberwolf_worker"
+COOKIE_VALUE = re.compile(rf"(?:^|;)\s*{STICKY_COOKIE}=(\d+)")
+
+class StickyProxy:
+    """
+    Reverse proxy that pins each browser to one app worker.
+    
+    A Streamlit session's state lives in the worker process that served its
+    websocket, so every request from a browser must reach the same worker.
+    The first response to a browser without the sticky cookie sets it to the
+    chosen worker (round-robin); later requests, including the websocket
+    upgrade, carry it. A browser whose worker is down is moved to the next one.
+    Bytes are passed through untouched otherwise, so websockets just work.
+    """
+    def __init__(self, workers, host="0.0.0.0", port=8501):
+        self.workers = workers  # [(host, port), ...]
+        self.host = host
+        self.port = port
+        self.connections = [0] * len(workers)
+        self._next = count()
+    
+    async def serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        async with server:
+            await server.serve_forever()
+    
+    def _pick(self, head):
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"cookie":
+                match = COOKIE_VALUE.search(value.decode('latin-1'))
+                if match and int(match.group(1)) < len(self.workers):
+                    return int(match.group(1)), False
+        return next(self._next) % len(self.workers), True
+    
+    async def _handle(self, client_reader, client_writer):
+        try:
+            head = await client_reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            client_writer.close()
+            return
+        
+        worker, assign = self._pick(head)
+        for _ in range(len(self.workers)):
+            try:
+                upstream_reader, upstream_writer = await asyncio.open_connection(*self.workers[worker])
+                break
+            except OSError:
+                worker, assign = (worker + 1) % len(self.workers), True
+        else:
+            client_writer.write(b"HTTP/1.1 502 Bad Gateway\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            client_writer.close()
+            return
+        
+        self.connections[worker] += 1
+        try:
+            upstream_writer.write(head)
+            await asyncio.gather(
+                self._pipe(client_reader, upstream_writer),
+                self._pipe(upstream_reader, client_writer, set_cookie=worker if assign else None)
+            )
+        finally:
+            self.connections[worker] -= 1
+    
+    async def _pipe(self, reader, writer, set_cookie=None):
+        try:
+            if set_cookie is not None:
+                head = await reader.readuntil(b"\r\n\r\n")
+                cookie = f"Set-Cookie: {STICKY_COOKIE}={set_cookie}; Path=/; HttpOnly; SameSite=Lax\r\n"
+                writer.write(head[:-2] + cookie.encode('latin-1') + b"\r\n")
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+def start_cluster(workers, worker_port=8600, server_port=8765, data_file="user_data.json", quiet=False):
+    """
+    Start the shared progress server and `workers` Streamlit processes bound
+    to localhost; returns (processes, worker addresses)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.DEVNULL if quiet else None
+    # Even on localhost, other users of the machine must not reach the store;
+    # the workers host the admin dashboard, so they get the admin token too
+    env = dict(
+        os.environ,
+        CYBERWOLF_SERVER_TOKEN=os.getenv("CYBERWOLF_SERVER_TOKEN") or secrets.token_urlsafe(32),
+        CYBERWOLF_SERVER_ADMIN_TOKEN=os.getenv("CYBERWOLF_SERVER_ADMIN_TOKEN") or secrets.token_urlsafe(32)
+    )
+    processes = [subprocess.Popen(
+        [sys.executable, os.path.join(here, "progress_server.py"),
+         "--port", str(server_port), "--data-file", data_file],
+        cwd=here, env=env, stdout=output, stderr=output
+    )]
+    
+    # Every worker shares progress (and the leaderboard and event stats built
+    # from it) through the progress server instead of its own JSON file
+    env["CYBERWOLF_DB_SERVER"] = f"127.0.0.1:{server_port}"
+    addresses = []
+    for i in range(workers):
+        port = worker_port + i
+        worker_env = dict(env)
+        # Metrics are per process, so each worker exports on its own port/file
+        if os.getenv("CYBERWOLF_METRICS_PORT"):
+            worker_env["CYBERWOLF_METRICS_PORT"] = str(int(os.environ["CYBERWOLF_METRICS_PORT"]) + i)
+        if os.getenv("CYBERWOLF_METRICS_FILE"):
+            worker_env["CYBERWOLF_METRICS_FILE"] = f"{os.environ['CYBERWOLF_METRICS_FILE']}.{i}"
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", os.path.join(here, "app.py"),
+             "--server.address", "127.0.0.1", "--server.port", str(port), "--server.headless", "true"],
+            cwd=here, env=worker_env, stdout=output, stderr=output
+        ))
+        addresses.append(("127.0.0.1", port))
+    return processes, addresses
+
+def wait_until_listening(addresses, timeout=60.0):
+    """
+    Block until every address accepts connections; False on timeout
+    """
+    deadline = time.monotonic() + timeout
+    for address in addresses:
+        while True:
+            try:
+                socket.create_connection(address, timeout=1.0).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.2)
+    return True
+
+def stop_cluster(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several app workers behind a sticky-session proxy")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--host", default="0.0.0.0", help="address the proxy listens on")
+    parser.add_argument("--port", type=int, default=8501, help="port the proxy listens on")
+    parser.add_argument("--worker-port", type=int, default=8600, help="first worker port; workers use consecutive ports")
+    parser.add_argument("--server-port", type=int, default=8765, help="progress server port")
+    parser.add_argument("--data-file", default="user_data.json")
+    args = parser.parse_args()
+    
+    processes, addresses = start_cluster(args.workers, args.worker_port, args.server_port, args.data_file)
+    # Stop the workers on SIGTERM as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        wait_until_listening(addresses)
+        print(f"{args.workers} workers behind http://{args.host}:{args.port}")
+        asyncio.run(StickyProxy(addresses, args.host, args.port).serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_cluster(processes)
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,76 @@
+import argparse
+import hashlib
+import heapq
 import json
 import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from itertools import chain, islice
 from datetime import datetime
 
+from leaderboard_index import LeaderboardIndex, leaderboard_entry
+from progress_events import get_event_log
+from user_record import UnsupportedSchemaError, UserRecord
+
+try:
+    import fcntl
+except ImportError:  # Windows: journal mode falls back to in-process locking only
+    fcntl = None
+
+# How many recent updates a store remembers for incremental leaderboard syncs
+CHANGE_FEED_SIZE = 10000
+
 class Database:
-    def __init__(self):
-        self.data_file = "user_data.json"
-        self._ensure_data_file()
-    
-    def _ensure_data_file(self):
-        """
-        Ensure the data file exists
-        """
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as f:
-                json.dump({}, f)
+    def __init__(self, data_file="user_data.json", journal=None, backend=None, db_path=None, events_path=None):
+        self.data_file = data_file
+        
+        # Storage backend is chosen by configuration so app.py never changes:
+        # "json" (default, user_data.json) or "sqlite" (WAL-mode database file).
+        if backend is None:
+            backend = os.getenv("CYBERWOLF_DB_BACKEND", "json")
+        self.backend = backend
+        
+        if backend == "sqlite":
+            from sqlite_store import SqliteStore
+            self.store = SqliteStore(db_path or os.getenv("CYBERWOLF_DB_PATH", "user_data.db"))
+        elif backend == "json":
+            shards = int(os.getenv("CYBERWOLF_DB_SHARDS", "1"))
+            # Records written under another shard count are moved over first
+            migrate_layout(data_file, shards)
+            if shards > 1:
+                self.store = ShardedJsonStore(data_file, shards, journal)
+            else:
+                self.store = JsonFileStore(data_file, journal)
+        else:
+            raise ValueError(f"Unknown database backend: {backend}")
+        
+        # Ranking is kept in memory and updated incrementally from the store's
+        # change feed instead of re-sorting every user on each request.
+        self._leaderboard = None
+        self._leaderboard_version = None
+        self._leaderboard_lock = threading.Lock()
+        
+        # Solves, hints and penalties are also kept as an append-only history
+        # with per-challenge aggregates maintained from it
+        self.events = get_event_log(events_path)
     
     def get_user_data(self, email):
         """
         Get user data from the database
         """
         try:
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
-                return data.get(email, None)
-        except (FileNotFoundError, json.JSONDecodeError):
+            record = self.store.get(email)
+            return record.to_dict() if record is not None else None
+        except CorruptDataError:
+            # Unlike a missing user, this must not let the caller start
+            # the user over (and overwrite their progress on the next save)
+            raise
+        except Exception as e:
+            print(f"Error reading user data: {e}")
             return None
     
     def save_user_data(self, email, health_score, completed_challenges, current_challenge, user_score=0):
@@ -31,55 +78,34 @@ class Database:
         Save user data to the database
         """
         try:
-            # Load existing data
-            try:
-                with open(self.data_file, 'r') as f:
-                    data = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                data = {}
-            
-            # Update user data
-            data[email] = {
-                'health_score': health_score,
-                'completed_challenges': completed_challenges,
-                'current_challenge': current_challenge,
-                'user_score': user_score,
-                'last_updated': datetime.now().isoformat()
-            }
-            
-            # Save updated data
-            with open(self.data_file, 'w') as f:
-                json.dump(data, f, indent=2)
-            
+            record = UserRecord.from_fields(
+                health_score,
+                completed_challenges,
+                current_challenge,
+                user_score,
+                datetime.now().isoformat()
+            )
+            self.store.put(email, record)
+            self._update_leaderboard()
             return True
-            
+        
         except Exception as e:
             print(f"Error saving user data: {e}")
             return False
     
-    def get_leaderboard(self):
+    def get_leaderboard(self, limit=None, offset=0):
         """
         Get leaderboard data (users sorted by health score and completed challenges)
         """
         try:
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
-            
-            # Convert to list and sort by completed challenges and health score
-            leaderboard = []
-            for email, user_data in data.items():
-                leaderboard.append({
-                    'email': email,
-                    'health_score': user_data.get('health_score', 0),
-                    'completed_challenges': len(user_data.get('completed_challenges', [])),
-                    'current_challenge': user_data.get('current_challenge', 1)
-                })
-            
-            # Sort by completed challenges (desc) then by health score (desc)
-            leaderboard.sort(key=lambda x: (x['completed_challenges'], x['health_score']), reverse=True)
-            
-            return leaderboard
+            # Sharded files are merged lazily, so only offset + limit rows are produced
+            if isinstance(self.store, ShardedJsonStore):
+                stop = None if limit is None else offset + limit
+                return [dict(row) for row in islice(self.store.iter_leaderboard(), offset, stop)]
             
+            with self._leaderboard_lock:
+                return self._sync_leaderboard().get_leaderboard(limit, offset)
+        
         except Exception as e:
             print(f"Error getting leaderboard: {e}")
             return []
@@ -89,24 +115,1170 @@ class Database:
         Reset user progress (for admin purposes)
         """
         try:
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
+            if not self.store.replace(email, _reset_record()):
+                return False
+            self._update_leaderboard()
+            return True
+        
+        except Exception as e:
+            print(f"Error resetting user progress: {e}")
+            return False
+    
+    def get_many(self, emails):
+        """
+        Get several users' data in one pass over storage; unknown emails are left out
+        """
+        try:
+            records = self.store.get_many(list(emails))
+            return {email: record.to_dict() for email, record in records.items()}
+        except CorruptDataError:
+            raise
+        except Exception as e:
+            print(f"Error reading user data: {e}")
+            return {}
+    
+    def save_many(self, progress):
+        """
+        Save several users in one write. `progress` maps each email to a dict
+        with the save_user_data fields (health_score, completed_challenges,
+        current_challenge and optionally user_score).
+        """
+        try:
+            now = datetime.now().isoformat()
+            records = [
+                (email, UserRecord.from_fields(
+                    fields['health_score'],
+                    fields['completed_challenges'],
+                    fields['current_challenge'],
+                    fields.get('user_score', 0),
+                    now
+                ))
+                for email, fields in progress.items()
+            ]
+            self.store.put_many(records)
+            self._update_leaderboard()
+            return True
+        
+        except Exception as e:
+            print(f"Error saving user data: {e}")
+            return False
+    
+    def reset_many(self, emails):
+        """
+        Reset several users' progress in one write (e.g. a whole cohort at the
+        start of a round); returns the emails that existed and were reset
+        """
+        try:
+            record = _reset_record()
+            reset = self.store.replace_many([(email, record) for email in emails])
+            self._update_leaderboard()
+            return reset
+        
+        except Exception as e:
+            print(f"Error resetting user progress: {e}")
+            return []
+    
+    def iter_leaderboard(self, batch_size=1000):
+        """
+        Yield leaderboard rows in ranking order without building the whole list
+        """
+        iter_rows = getattr(self.store, "iter_leaderboard", None)
+        if iter_rows is not None:
+            for row in iter_rows():
+                yield dict(row)
+            return
+        
+        # Page through the in-memory index; a user whose score changes while
+        # the export runs may move between pages
+        offset = 0
+        while True:
+            with self._leaderboard_lock:
+                page = self._sync_leaderboard().get_leaderboard(batch_size, offset)
+            if not page:
+                return
+            yield from page
+            offset += len(page)
+    
+    def export_columns(self):
+        """
+        Every user's stored fields as parallel lists, one per field, for bulk
+        analytics; plain JSON so it also works through the progress server
+        """
+        try:
+            columns = {field: [] for field in COLUMN_FIELDS}
+            for email, record in self.store.items():
+                columns['email'].append(email)
+                columns['health_score'].append(record.health_score)
+                columns['completed_mask'].append(record.completed_mask)
+                columns['current_challenge'].append(record.current_challenge)
+                columns['user_score'].append(record.user_score)
+                columns['last_updated'].append(record.last_updated)
+            return columns
+        
+        except Exception as e:
+            print(f"Error exporting user data: {e}")
+            return None
+    
+    def export_event_columns(self):
+        """
+        The whole progress history as parallel lists (type, email, challenge,
+        ts, amount), in append order
+        """
+        try:
+            events = self.events.load_events()
+            return {field: [event.get(field) for event in events] for field in EVENT_COLUMN_FIELDS}
+        
+        except Exception as e:
+            print(f"Error exporting progress events: {e}")
+            return None
+    
+    def get_version(self):
+        """
+        Opaque value that changes whenever stored progress does (including
+        other processes' writes), for caching anything derived from it
+        """
+        try:
+            version, _ = self.store.changes_since(None)
+            # Sharded stores report a tuple; keep it JSON-friendly for the progress server
+            return list(version) if isinstance(version, tuple) else version
+        
+        except Exception as e:
+            print(f"Error reading store version: {e}")
+            return None
+    
+    def get_events_version(self):
+        """
+        As get_version, for the progress history; events such as a penalty at
+        zero health are recorded without any progress save
+        """
+        try:
+            return self.events.version()
+        
+        except Exception as e:
+            print(f"Error reading progress history version: {e}")
+            return None
+    
+    def get_rank(self, email):
+        """
+        Get a user's 1-based leaderboard rank (tied users share a rank)
+        """
+        try:
+            with self._leaderboard_lock:
+                return self._sync_leaderboard().get_rank(email)
+        
+        except Exception as e:
+            print(f"Error getting rank: {e}")
+            return None
+    
+    def record_event(self, email, event_type, challenge_num, amount=None):
+        """
+        Append a start/solve/hint/penalty event to the progress history
+        """
+        try:
+            self.events.record(event_type, email, challenge_num, amount)
+            return True
+        
+        except Exception as e:
+            print(f"Error recording progress event: {e}")
+            return False
+    
+    def get_challenge_stats(self, challenge_num=None):
+        """
+        Solve count, median time-to-solve and hint usage rate for one challenge,
+        or a list for every challenge with events when challenge_num is None
+        """
+        try:
+            if challenge_num is None:
+                return self.events.all_stats()
+            return self.events.challenge_stats(challenge_num)
+        
+        except Exception as e:
+            print(f"Error getting challenge stats: {e}")
+            return [] if challenge_num is None else None
+    
+    def compact(self):
+        """
+        Fold the journal into the snapshot file (JSON journal mode only)
+        """
+        compact = getattr(self.store, "compact", None)
+        return compact() if compact else False
+    
+    def _sync_leaderboard(self):
+        """
+        Apply changes made since the last sync (including other processes' writes);
+        the index is only rebuilt from scratch when the store cannot say what changed
+        """
+        version, changes = self.store.changes_since(self._leaderboard_version)
+        if changes is None or self._leaderboard is None:
+            self._leaderboard = LeaderboardIndex(self.store.items())
+        else:
+            for email, record in changes:
+                self._leaderboard.update(email, record)
+        self._leaderboard_version = version
+        return self._leaderboard
+    
+    def _update_leaderboard(self):
+        # Pull the write through the change feed rather than applying it
+        # directly, so the index sees concurrent writers in store order
+        with self._leaderboard_lock:
+            if self._leaderboard is not None:
+                self._sync_leaderboard()
+
+# Fields returned by Database.export_columns / export_event_columns
+COLUMN_FIELDS = ('email', 'health_score', 'completed_mask', 'current_challenge', 'user_score', 'last_updated')
+EVENT_COLUMN_FIELDS = ('type', 'email', 'challenge', 'ts', 'amount')
+
+_remote_databases = {}
+_remote_lock = threading.Lock()
+
+def open_database():
+    """
+    The app's database: local files, or a progress server shared by several
+    app nodes when CYBERWOLF_DB_SERVER (host:port) is set, authenticated
+    with CYBERWOLF_SERVER_TOKEN (and CYBERWOLF_SERVER_ADMIN_TOKEN for the
+    analytics dashboard)
+    """
+    server = os.getenv("CYBERWOLF_DB_SERVER")
+    if server:
+        # One client (and connection pool) per process, not per script run
+        with _remote_lock:
+            if server not in _remote_databases:
+                from progress_client import RemoteDatabase
+                _remote_databases[server] = RemoteDatabase(
+                    server,
+                    pool_size=int(os.getenv("CYBERWOLF_DB_POOL_SIZE", "8")),
+                    token=os.getenv("CYBERWOLF_SERVER_TOKEN") or None,
+                    admin_token=os.getenv("CYBERWOLF_SERVER_ADMIN_TOKEN") or None
+                )
+            return _remote_databases[server]
+    return Database()
+
+def _reset_record():
+    return UserRecord(
+        health_score=100,
+        completed_mask=0,
+        current_challenge=1,
+        last_updated=datetime.now().isoformat()
+    )
+
+def decode_records(data):
+    """
+    Parsed user_data.json -> {email: UserRecord}; accepts every schema version
+    """
+    return {email: UserRecord.from_json(value) for email, value in data.items()}
+
+def encode_records(data):
+    # One C-accelerated dumps call; indent=2 would fall back to the pure-Python
+    # encoder and roughly double the file size
+    return json.dumps({email: record.to_json() for email, record in data.items()}, separators=(',', ':'))
+
+class CorruptDataError(ValueError):
+    """
+    A data file exists but cannot be parsed and no earlier checkpoint can
+    stand in for it, or was written in a schema version this code cannot
+    read. Raised (also by get_user_data) instead of letting every user look
+    brand new.
+    """
+
+def read_checkpoint(path):
+    """
+    Load a snapshot file. Returns (data, source), where source is the file the
+    data actually came from (None when no snapshot exists yet). A damaged file
+    falls back to the previous checkpoint kept next to it.
+    """
+    try:
+        with open(path, 'r') as f:
+            return decode_records(json.load(f)), path
+    except FileNotFoundError:
+        return {}, None
+    except UnsupportedSchemaError as e:
+        # Written by a newer version; the previous checkpoint would be stale
+        raise CorruptDataError(f"{path} cannot be read by this version: {e}")
+    except ValueError as e:
+        error = e
+    
+    previous = path + ".prev"
+    try:
+        with open(previous, 'r') as f:
+            data = decode_records(json.load(f))
+    except (OSError, ValueError):
+        raise CorruptDataError(f"{path} is damaged ({error}) and there is no usable previous checkpoint")
+    print(f"Warning: {path} is damaged ({error}); recovered {len(data)} users from {previous}")
+    return data, previous
+
+def write_checkpoint(path, data, keep_previous=True):
+    """
+    Durably replace a snapshot file; returns its new stat signature
+    """
+    tmp_file, sig = _write_temp(path, data)
+    _install_checkpoint(tmp_file, path, keep_previous)
+    return sig
+
+def _write_temp(path, data):
+    """
+    Write and fsync the next checkpoint beside `path`; returns (temp file, stat signature)
+    """
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, 'w') as f:
+        f.write(encode_records(data))
+        f.flush()
+        os.fsync(f.fileno())
+        st = os.fstat(f.fileno())
+    return tmp_file, (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _install_checkpoint(tmp_file, path, keep_previous=True):
+    """
+    Rename a written checkpoint into place. The file it replaces stays
+    reachable as `path.prev` (a hard link, so nothing is copied) for recovery;
+    callers pass keep_previous=False when that file is itself damaged.
+    """
+    if keep_previous:
+        previous = path + ".prev"
+        try:
+            os.remove(previous)
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(path, previous)
+        except OSError:
+            pass  # first checkpoint, or no hard links on this filesystem
+    os.replace(tmp_file, path)
+    _fsync_directory(path)
+
+def _repair_journal_tail(log):
+    """
+    Cut off a last line left without its newline by a writer that died
+    mid-append; otherwise the next append would be glued onto it. The caller
+    holds the exclusive lock, so no append can be in flight. Returns the
+    number of bytes removed.
+    """
+    end = log.seek(0, os.SEEK_END)
+    if end == 0:
+        return 0
+    log.seek(end - 1)
+    if log.read(1) == b"\n":
+        return 0
+    
+    keep = 0
+    pos = end
+    while pos > 0:
+        start = max(0, pos - 65536)
+        log.seek(start)
+        newline = log.read(pos - start).rfind(b"\n")
+        if newline != -1:
+            keep = start + newline + 1
+            break
+        pos = start
+    log.truncate(keep)
+    return end - keep
+
+class _ChangeFeed:
+    """
+    Bounded log of recent (version, email, record) updates, consumed by the
+    leaderboard index to sync incrementally
+    """
+    def __init__(self):
+        self.version = 0
+        self.reset_version = 0
+        self.changes = deque(maxlen=CHANGE_FEED_SIZE)
+    
+    def note_change(self, email, record):
+        self.version += 1
+        self.changes.append((self.version, email, record))
+    
+    def note_reset(self):
+        """
+        The data was reloaded wholesale; consumers must rebuild
+        """
+        self.version += 1
+        self.reset_version = self.version
+        self.changes.clear()
+    
+    def since(self, version):
+        """
+        Return (current_version, [(email, record), ...]) for updates after
+        `version`, or (current_version, None) when a full reload is required
+        """
+        if version is None or version < self.reset_version:
+            return self.version, None
+        if self.changes and self.changes[0][0] > version + 1:
+            return self.version, None
+        
+        changes = []
+        for change_version, email, record in reversed(self.changes):
+            if change_version <= version:
+                break
+            changes.append((email, record))
+        changes.reverse()
+        return self.version, changes
+
+class _ParsedSnapshot:
+    """
+    Process-wide parsed copy of one JSON data file, shared by every store and
+    Streamlit session in the process. `version` counts in-process reloads and
+    writes; hits/misses show how often the parse was avoided.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.sig = None
+        self.data = None
+        self.source = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.feed = _ChangeFeed()
+        self._writer = None
+        self._installing_sig = None
+    
+    def load(self):
+        """
+        Parsed file contents, re-read only when the file's inode/mtime/size
+        changed (e.g. another worker process wrote it). Caller holds `lock`.
+        """
+        sig = _stat_signature(self.path)
+        # The file our writer is renaming into place holds the data it is
+        # about to install; until then the previous contents stand
+        if self.data is not None and (sig == self.sig or sig == self._installing_sig):
+            self.hits += 1
+            return self.data
+        
+        self.misses += 1
+        try:
+            # Writes are atomic renames, so a file that fails to parse is
+            # really damaged rather than caught mid-write
+            data, self.source = read_checkpoint(self.path)
+        except CorruptDataError:
+            self.data = self.sig = None
+            raise
+        
+        # The signature is taken before reading, so a write racing with the
+        # read shows up as a changed signature next time rather than being missed
+        self.data = data
+        self.sig = sig
+        self.version += 1
+        self.feed.note_reset()
+        return data
+    
+    def write(self, data):
+        """
+        Atomically replace the file (temp file, fsync, rename). Caller holds `lock`.
+        """
+        # A damaged file must not displace the good previous checkpoint
+        self.installed(data, write_checkpoint(self.path, data, keep_previous=self.source in (None, self.path)))
+    
+    def installed(self, data, sig):
+        """
+        Adopt `data` as the file's contents after it was written (signature
+        `sig`) without holding `lock`. Caller holds `lock`.
+        """
+        self.sig = sig
+        self.data = data
+        self.source = self.path
+        self.version += 1
+        self._installing_sig = None
+    
+    def installing(self, sig):
+        """
+        A checkpoint with signature `sig` is about to be renamed into place by
+        this process; load() must not re-parse it. Caller holds `lock`.
+        """
+        self._installing_sig = sig
+    
+    def writer(self):
+        with self.lock:
+            if self._writer is None:
+                self._writer = _GroupCommitWriter(self)
+            return self._writer
+
+class _PendingWrite:
+    def __init__(self, email, record, only_existing):
+        self.email = email
+        self.record = record
+        self.only_existing = only_existing
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+class _GroupCommitWriter:
+    """
+    Single writer thread per data file. Concurrent save/reset callers enqueue
+    their update and block; the thread gathers everything that arrives within
+    a short window, applies it in one atomic rewrite and then wakes them all.
+    """
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.lock_file = snapshot.path + ".lock"
+        self.window = float(os.getenv("CYBERWOLF_DB_COMMIT_WINDOW_MS", "2")) / 1000
+        self.commits = 0
+        self.writes = 0
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name="user-data-writer", daemon=True).start()
+    
+    def submit(self, email, record, only_existing=False):
+        """
+        Queue one update and wait until it is durable; returns False if
+        `only_existing` was set and the user does not exist
+        """
+        return self.submit_many([(email, record)], only_existing)[0]
+    
+    def submit_many(self, records, only_existing=False):
+        """
+        Queue several updates as one unit, so they land in the same rewrite;
+        returns one result per (email, record) pair, as for submit()
+        """
+        batch = [_PendingWrite(email, record, only_existing) for email, record in records]
+        if not batch:
+            return []
+        self._queue.put(batch)
+        for pending in batch:
+            pending.done.wait()
+        for pending in batch:
+            if pending.error is not None:
+                raise pending.error
+        return [pending.result for pending in batch]
+    
+    def _run(self):
+        while True:
+            batch = list(self._queue.get())
+            deadline = time.monotonic() + self.window
+            while True:
+                try:
+                    batch.extend(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
             
-            if email in data:
-                data[email] = {
-                    'health_score': 100,
-                    'completed_challenges': [],
-                    'current_challenge': 1,
-                    'last_updated': datetime.now().isoformat()
-                }
+            try:
+                self._commit(batch)
+            except Exception as e:
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+    
+    def _commit(self, batch):
+        snapshot = self.snapshot
+        with open(self.lock_file, 'a') as lock:
+            # The file lock serializes writers across worker processes (this
+            # thread is the only one in this process); the snapshot is
+            # re-validated under it so no one's update is lost
+            _flock(lock, exclusive=True)
+            try:
+                # Readers share snapshot.lock, so hold it only to take a copy;
+                # the temp file write, fsync and rename happen without it
+                with snapshot.lock:
+                    data = dict(snapshot.load())
+                    keep_previous = snapshot.source in (None, snapshot.path)
                 
-                with open(self.data_file, 'w') as f:
-                    json.dump(data, f, indent=2)
+                applied = []
+                for pending in batch:
+                    if pending.only_existing and pending.email not in data:
+                        pending.result = False
+                        continue
+                    data[pending.email] = pending.record
+                    pending.result = True
+                    applied.append(pending)
+                if not applied:
+                    return
                 
-                return True
-            
+                tmp_file, sig = _write_temp(snapshot.path, data)
+                with snapshot.lock:
+                    snapshot.installing(sig)
+                _install_checkpoint(tmp_file, snapshot.path, keep_previous)
+                with snapshot.lock:
+                    snapshot.installed(data, sig)
+                    for pending in applied:
+                        snapshot.feed.note_change(pending.email, pending.record)
+                self.commits += 1
+                self.writes += len(applied)
+            finally:
+                _flock(lock, unlock=True)
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def _parsed_snapshot(path):
+    path = os.path.abspath(path)
+    with _snapshots_lock:
+        if path not in _snapshots:
+            _snapshots[path] = _ParsedSnapshot(path)
+        return _snapshots[path]
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+def _fsync_directory(path):
+    # Makes the rename itself durable; not supported on Windows
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def _flock(f, exclusive=False, unlock=False):
+    if fcntl is None:
+        return
+    if unlock:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+class JsonFileStore:
+    """
+    User records kept in a single JSON document (user_data.json)
+    """
+    def __init__(self, data_file, journal=None):
+        self.data_file = data_file
+        self.journal_file = data_file + ".log"
+        
+        # Journal mode appends one JSON line per update instead of rewriting the
+        # whole file; a background thread folds the log back into the snapshot.
+        if journal is None:
+            journal = os.getenv("CYBERWOLF_DB_JOURNAL", "0") == "1"
+        self.journal = journal
+        self.compact_threshold = int(os.getenv("CYBERWOLF_DB_COMPACT_EVERY", "1000"))
+        
+        self._lock = threading.RLock()
+        self._data = None
+        self._snapshot_sig = None
+        self._snapshot_source = None
+        self._journal_ino = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._skipped_lines = 0
+        self._compacting = False
+        
+        # Journal mode keeps its own change feed; snapshot mode shares the
+        # process-wide one so writes from every store instance are seen
+        self._feed = _ChangeFeed()
+        self._snapshot = _parsed_snapshot(data_file)
+        self._sorted_rows = (None, [])
+        self._ensure_data_file()
+        self.recovery = self._recover()
+    
+    def _ensure_data_file(self):
+        """
+        Ensure the data file exists
+        """
+        if not os.path.exists(self.data_file):
+            # Linking fails if another worker created it first, so a concurrent
+            # reader never sees a half-written file
+            tmp_file, _ = _write_temp(self.data_file, {})
+            try:
+                os.link(tmp_file, self.data_file)
+            except FileExistsError:
+                pass
+            finally:
+                os.remove(tmp_file)
+        if self.journal and not os.path.exists(self.journal_file):
+            open(self.journal_file, 'a').close()
+    
+    def _recover(self):
+        """
+        Startup: rebuild the last consistent state from the checkpoint and, in
+        journal mode, the journal records after it. Returns what was done and
+        how long it took.
+        """
+        started = time.perf_counter()
+        torn_bytes = 0
+        if self.journal:
+            with self._lock:
+                with self._locked_journal('a+b', exclusive=True) as log:
+                    torn_bytes = _repair_journal_tail(log)
+                self._refresh()
+                users = len(self._data)
+                source = self._snapshot_source
+                journal_records = self._journal_records
+            if torn_bytes:
+                print(f"Warning: dropped an incomplete {torn_bytes}-byte record from the end of {self.journal_file}")
+            # Keep the next restart's replay bounded
+            self._maybe_compact()
+        else:
+            with self._snapshot.lock:
+                users = len(self._snapshot.load())
+                source = self._snapshot.source
+            journal_records = 0
+        
+        return {
+            'seconds': time.perf_counter() - started,
+            'users': users,
+            'source': source,
+            'journal_records': journal_records,
+            'torn_bytes': torn_bytes,
+            'skipped_lines': self._skipped_lines
+        }
+    
+    def get(self, email):
+        if self.journal:
+            with self._lock:
+                self._refresh()
+                return self._data.get(email)
+        
+        with self._snapshot.lock:
+            return self._snapshot.load().get(email)
+    
+    def get_many(self, emails):
+        if self.journal:
+            with self._lock:
+                self._refresh()
+                data = self._data
+                return {email: data[email] for email in emails if email in data}
+        
+        with self._snapshot.lock:
+            data = self._snapshot.load()
+            return {email: data[email] for email in emails if email in data}
+    
+    def put(self, email, record):
+        if self.journal:
+            self._append([(email, record)])
+            return
+        
+        self._snapshot.writer().submit(email, record)
+    
+    def put_many(self, records):
+        """
+        Write (email, record) pairs as one journal append or one file rewrite
+        """
+        records = list(records)
+        if self.journal:
+            self._append(records)
+        else:
+            self._snapshot.writer().submit_many(records)
+        return len(records)
+    
+    def replace(self, email, record):
+        """
+        Overwrite an existing user's record; returns False for unknown users
+        """
+        if self.journal:
+            with self._lock:
+                self._refresh()
+                if email not in self._data:
+                    return False
+                self._append([(email, record)])
+            return True
+        
+        return self._snapshot.writer().submit(email, record, only_existing=True)
+    
+    def replace_many(self, records):
+        """
+        Overwrite the existing users among (email, record) pairs in one write;
+        returns the emails that were replaced
+        """
+        records = list(records)
+        if self.journal:
+            with self._lock:
+                self._refresh()
+                existing = [(email, record) for email, record in records if email in self._data]
+                self._append(existing)
+            return [email for email, _ in existing]
+        
+        results = self._snapshot.writer().submit_many(records, only_existing=True)
+        return [email for (email, _), replaced in zip(records, results) if replaced]
+    
+    def items(self):
+        if self.journal:
+            with self._lock:
+                self._refresh()
+                return list(self._data.items())
+        
+        with self._snapshot.lock:
+            return list(self._snapshot.load().items())
+    
+    def changes_since(self, version):
+        """
+        Return (current_version, [(email, record), ...]) for updates after
+        `version`, or (current_version, None) when a full reload is required
+        """
+        if self.journal:
+            with self._lock:
+                self._refresh()
+                return self._feed.since(version)
+        
+        with self._snapshot.lock:
+            self._snapshot.load()
+            return self._snapshot.feed.since(version)
+    
+    def leaderboard_rows(self):
+        """
+        This file's leaderboard rows in ranking order, re-sorted only after it changed
+        """
+        version, _ = self.changes_since(None)
+        cached_version, rows = self._sorted_rows
+        if cached_version != version:
+            rows = [leaderboard_entry(email, record) for email, record in self.items()]
+            rows.sort(key=lambda x: (x['completed_challenges'], x['health_score']), reverse=True)
+            self._sorted_rows = (version, rows)
+        return rows
+    
+    def compact(self):
+        """
+        Fold the journal into the snapshot file (journal mode only)
+        """
+        if not self.journal:
             return False
+        
+        # Serialize a point-in-time copy without holding any lock, so writers
+        # keep appending while the (O(users)) snapshot is being produced.
+        with self._lock:
+            self._refresh()
+            data = dict(self._data)
+            offset = self._journal_offset
+            sig = self._snapshot_sig
+            keep_previous = self._snapshot_source in (None, self.data_file)
+        
+        tmp_file, _ = _write_temp(self.data_file, data)
+        
+        with self._lock, self._locked_journal('rb', exclusive=True) as log:
+            # Someone else compacted first; their snapshot already covers ours
+            if _stat_signature(self.data_file) != sig:
+                os.remove(tmp_file)
+                return False
             
+            # Keep only the records appended while the snapshot was written,
+            # in a new journal renamed over the old one, so a crash at any
+            # point leaves either the old journal or the tail; replaying the
+            # old journal over the new snapshot is harmless
+            log.seek(offset)
+            tail_file = f"{self.journal_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tail_file, 'wb') as tail:
+                tail.write(log.read())
+                tail.flush()
+                os.fsync(tail.fileno())
+            _install_checkpoint(tmp_file, self.data_file, keep_previous)
+            os.replace(tail_file, self.journal_file)
+            _fsync_directory(self.journal_file)
+            
+            self._snapshot_sig = _stat_signature(self.data_file)
+            self._snapshot_source = self.data_file
+        
+        # Start reading the new journal, which holds just the tail
+        with self._lock:
+            self._refresh()
+        
+        return True
+    
+    def _append(self, records):
+        """
+        Append (email, record) updates to the journal in a single write and
+        apply them to the in-memory state
+        """
+        if not records:
+            return
+        lines = "".join(
+            json.dumps({'email': email, 'record': record.to_json()}) + "\n"
+            for email, record in records
+        )
+        
+        with self._lock:
+            self._refresh()
+            with self._locked_journal('a+b', exclusive=True) as log:
+                _repair_journal_tail(log)
+                log.write(lines.encode('utf-8'))
+                log.flush()
+            self._refresh()
+        
+        self._maybe_compact()
+    
+    def _maybe_compact(self):
+        with self._lock:
+            should_compact = self._journal_records >= self.compact_threshold and not self._compacting
+            if should_compact:
+                self._compacting = True
+        
+        if should_compact:
+            threading.Thread(target=self._background_compact, daemon=True).start()
+    
+    def _background_compact(self):
+        try:
+            self.compact()
         except Exception as e:
-            print(f"Error resetting user progress: {e}")
-            return False
+            print(f"Error compacting user data: {e}")
+        finally:
+            self._compacting = False
+    
+    def _refresh(self):
+        """
+        Bring the in-memory state up to date with the snapshot and journal on disk
+        """
+        with self._locked_journal('rb') as log:
+            sig = _stat_signature(self.data_file)
+            st = os.fstat(log.fileno())
+            
+            # Another process compacted (new snapshot, new journal file) or
+            # truncated the log
+            if (self._data is None or sig != self._snapshot_sig or st.st_ino != self._journal_ino
+                    or st.st_size < self._journal_offset):
+                if self._data is None or sig != self._snapshot_sig:
+                    self._data, self._snapshot_source = read_checkpoint(self.data_file)
+                    self._snapshot_sig = sig
+                self._journal_ino = st.st_ino
+                self._journal_offset = 0
+                self._journal_records = 0
+                self._feed.note_reset()
+            
+            self._read_journal(log)
+    
+    @contextmanager
+    def _locked_journal(self, mode, exclusive=False):
+        """
+        Open and lock the journal. Compaction renames a new journal into
+        place, so if that happened while we waited for the lock, the file we
+        hold is stale and the current one is opened instead.
+        """
+        while True:
+            log = open(self.journal_file, mode)
+            try:
+                _flock(log, exclusive=exclusive)
+                try:
+                    if os.fstat(log.fileno()).st_ino == os.stat(self.journal_file).st_ino:
+                        yield log
+                        return
+                finally:
+                    _flock(log, unlock=True)
+            finally:
+                log.close()
+    
+    def _read_journal(self, log):
+        log.seek(self._journal_offset)
+        for line in log:
+            # A line without its newline is still being written by someone else
+            if not line.endswith(b"\n"):
+                break
+            self._journal_offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                record = UserRecord.from_json(entry['record'])
+            except UnsupportedSchemaError as e:
+                raise CorruptDataError(f"{self.journal_file} cannot be read by this version: {e}")
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                # e.g. a torn record that an older version appended onto
+                self._skipped_lines += 1
+                print(f"Warning: skipping unreadable record in {self.journal_file}: {e}")
+                continue
+            self._data[entry['email']] = record
+            self._journal_records += 1
+            self._feed.note_change(entry['email'], record)
+
+def shard_files(data_file, shards):
+    root, ext = os.path.splitext(data_file)
+    return [f"{root}.shard{i:02d}-of-{shards:02d}{ext}" for i in range(shards)]
+
+def shard_index(email, shards):
+    # hash() is salted per process, so use a stable digest instead
+    digest = hashlib.blake2b(email.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % shards
+
+def _shard_counts_on_disk(data_file):
+    """
+    Shard counts that have shard files beside `data_file`
+    """
+    root, ext = os.path.splitext(os.path.basename(data_file))
+    pattern = re.compile(re.escape(root) + r"\.shard\d+-of-(\d+)" + re.escape(ext))
+    counts = set()
+    for name in os.listdir(os.path.dirname(os.path.abspath(data_file))):
+        match = pattern.fullmatch(name)
+        if match:
+            counts.add(int(match.group(1)))
+    return counts
+
+def _read_with_journal(path):
+    """
+    A store file's records, including journal records not yet compacted into it
+    """
+    data, _ = read_checkpoint(path)
+    try:
+        with open(path + ".log", 'rb') as log:
+            for line in log:
+                if not line.endswith(b"\n") or not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    data[entry['email']] = UserRecord.from_json(entry['record'])
+                except (ValueError, KeyError, IndexError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return data
+
+def _retire(path):
+    # Renamed rather than deleted, so a migrated layout can never be read again
+    # by mistake but is still there to inspect
+    for name in (path, path + ".log", path + ".prev"):
+        if os.path.exists(name):
+            os.replace(name, name + ".migrated")
+
+def migrate_layout(data_file, shards):
+    """
+    Move every user record into the layout for `shards` files (1 being the
+    plain data file) when the records on disk were written under another
+    shard count. The old files are renamed to *.migrated once the new ones are
+    written. Raises ValueError, rather than guessing, when more than one
+    layout holds data.
+    """
+    counts = _shard_counts_on_disk(data_file) - {shards}
+    if shards > 1:
+        targets = shard_files(data_file, shards)
+        if not counts and (any(os.path.exists(path) for path in targets) or not os.path.exists(data_file)):
+            return
+    elif not counts:
+        return
+    
+    with open(data_file + ".lock", 'a') as lock:
+        _flock(lock, exclusive=True)
+        try:
+            # Another worker may have done it while we waited for the lock
+            counts = _shard_counts_on_disk(data_file) - {shards}
+            if shards > 1:
+                current = [path for path in targets if os.path.exists(path)]
+            else:
+                current = [data_file] if os.path.exists(data_file) else []
+            
+            if counts and current or len(counts) > 1:
+                layouts = sorted(counts | ({shards} if current else set()))
+                raise ValueError(
+                    f"User data for {data_file} exists for several shard counts {layouts}; "
+                    f"move the stale files aside before starting with CYBERWOLF_DB_SHARDS={shards}"
+                )
+            if counts:
+                sources = shard_files(data_file, counts.pop())
+            elif shards > 1 and not current and os.path.exists(data_file):
+                sources = [data_file]
+            else:
+                return
+            
+            data = {}
+            for path in sources:
+                if os.path.exists(path):
+                    data.update(_read_with_journal(path))
+            
+            if shards > 1:
+                parts = [{} for _ in targets]
+                for email, record in data.items():
+                    parts[shard_index(email, shards)][email] = record
+                for path, part in zip(targets, parts):
+                    _parsed_snapshot(path).write(part)
+            else:
+                _parsed_snapshot(data_file).write(data)
+            
+            for path in sources:
+                _retire(path)
+            print(f"Moved {len(data)} users from {len(sources)} to {shards} data files")
+        finally:
+            _flock(lock, unlock=True)
+
+class ShardedJsonStore:
+    """
+    User records split across N JSON files by a stable hash of the email.
+    
+    A write rewrites only its own shard, and each shard has its own writer
+    thread and file lock, so writes to different shards proceed in parallel.
+    """
+    def __init__(self, data_file, shards, journal=None):
+        self.data_file = data_file
+        self.shard_files = shard_files(data_file, shards)
+        self.shards = [JsonFileStore(path, journal) for path in self.shard_files]
+    
+    def _shard_index(self, email):
+        return shard_index(email, len(self.shard_files))
+    
+    def _shard(self, email):
+        return self.shards[self._shard_index(email)]
+    
+    def get(self, email):
+        return self._shard(email).get(email)
+    
+    def put(self, email, record):
+        self._shard(email).put(email, record)
+    
+    def replace(self, email, record):
+        return self._shard(email).replace(email, record)
+    
+    def _group_by_shard(self, items, key=lambda item: item[0]):
+        groups = {}
+        for item in items:
+            groups.setdefault(self._shard_index(key(item)), []).append(item)
+        return groups
+    
+    def get_many(self, emails):
+        # One lookup pass per shard touched rather than per email
+        result = {}
+        for index, group in self._group_by_shard(emails, key=lambda email: email).items():
+            result.update(self.shards[index].get_many(group))
+        return result
+    
+    def put_many(self, records):
+        """
+        One write per shard touched
+        """
+        return sum(self.shards[index].put_many(group)
+                   for index, group in self._group_by_shard(records).items())
+    
+    def replace_many(self, records):
+        replaced = []
+        for index, group in self._group_by_shard(records).items():
+            replaced.extend(self.shards[index].replace_many(group))
+        return replaced
+    
+    def items(self):
+        return list(chain.from_iterable(shard.items() for shard in self.shards))
+    
+    def changes_since(self, version):
+        """
+        Versions are tuples of per-shard versions; any shard needing a full
+        reload makes the whole result a full reload
+        """
+        versions = []
+        changes = []
+        for i, shard in enumerate(self.shards):
+            shard_version, shard_changes = shard.changes_since(version[i] if version else None)
+            versions.append(shard_version)
+            if changes is not None and shard_changes is not None:
+                changes.extend(shard_changes)
+            else:
+                changes = None
+        return tuple(versions), changes
+    
+    def iter_leaderboard(self):
+        """
+        K-way merge of the shards' sorted rows; rows are produced on demand
+        """
+        return heapq.merge(
+            *(shard.leaderboard_rows() for shard in self.shards),
+            key=lambda x: (-x['completed_challenges'], -x['health_score'])
+        )
+    
+    def compact(self):
+        return all([shard.compact() for shard in self.shards])
+
+def main():
+    parser = argparse.ArgumentParser(description="Open the user data store as the app does at startup and report recovery time")
+    parser.add_argument("data_file", nargs="?", default="user_data.json")
+    parser.add_argument("--journal", action="store_true", default=None, help="open in journal mode")
+    args = parser.parse_args()
+    
+    started = time.perf_counter()
+    db = Database(args.data_file, journal=args.journal)
+    elapsed = time.perf_counter() - started
+    
+    for store in getattr(db.store, "shards", [db.store]):
+        recovery = getattr(store, "recovery", None)
+        if recovery is None:
+            continue
+        print(f"{store.data_file}: {recovery['users']} users from {recovery['source']}, "
+              f"{recovery['journal_records']} journal records replayed, "
+              f"{recovery['torn_bytes']} torn bytes dropped, {recovery['skipped_lines']} unreadable lines skipped "
+              f"in {recovery['seconds']:.3f}s")
+    print(f"Startup took {elapsed:.3f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import os
 import json
-import requests
 import streamlit as st
 
 class FirebaseAuth:
@@ -29,6 +28,10 @@ class FirebaseAuth:
                 "token": "demo_token_" + email.split('@')[0]
             }
         
+        # Imported here so the login page renders without loading it; demo
+        # logins never need it
+        import requests
+        
         try:
             payload = {
                 "email": email,
@@ -69,6 +72,7 @@ class FirebaseAuth:
         Verify Firebase ID token
         """
         try:
+            import requests
             verify_url = f"https://identitytoolkit.googleapis.com/v1/accounts:lookup?key={self.api_key}"
             payload = {"idToken": token}
             
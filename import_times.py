@@ -0,0 +1,58 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Lines look like "import time:       123 |       4567 |   some.module", with
+# two more spaces of indentation per level of nesting; children come first
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\| (\s*)(\S+)")
+
+def measure(module="app", runs=3):
+    """
+    Import `module` in fresh interpreters with -X importtime. Returns
+    (total seconds, {direct import: cumulative seconds}) for the fastest run;
+    the module's own body is listed under its own name.
+    """
+    best = None
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=here, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        
+        children = {}
+        for line in result.stderr.splitlines():
+            match = LINE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            if len(indent) == 2:
+                children[name] = int(cumulative_us) / 1e6
+            elif not indent:
+                if name == module:
+                    children[name] = int(self_us) / 1e6
+                    total = int(cumulative_us) / 1e6
+                    if best is None or total < best[0]:
+                        best = (total, children)
+                    break
+                children = {}
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time breakdown of the app's cold start")
+    parser.add_argument("module", nargs="?", default="app")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    
+    total, modules = measure(args.module, args.runs)
+    print(f"Importing {args.module}: {total * 1000:.1f} ms (best of {args.runs})")
+    for name, seconds in sorted(modules.items(), key=lambda x: x[1], reverse=True)[:args.top]:
+        print(f"{seconds * 1000:9.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from itertools import chain
+
+from database import open_database
+
+FIELDS = ('rank', 'email', 'completed_challenges', 'health_score', 'current_challenge')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def ranked_rows(rows):
+    """
+    Attach a competition rank (ties share a rank) to rows already in ranking order
+    """
+    rank = 0
+    previous = None
+    for position, row in enumerate(rows, 1):
+        key = (row['completed_challenges'], row['health_score'])
+        if key != previous:
+            rank = position
+            previous = key
+        yield {'rank': rank, **row}
+
+def iter_jsonl(rows):
+    for row in ranked_rows(rows):
+        yield json.dumps(row) + "\n"
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for row in chain([None], ranked_rows(rows)):
+        if row is not None:
+            writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+FORMATS = {
+    'jsonl': iter_jsonl,
+    'csv': iter_csv
+}
+
+def stream_leaderboard(db, fmt='jsonl', encoding=None):
+    """
+    Generator of leaderboard lines in the requested format. Pass an encoding
+    to get bytes, e.g. to hand straight to a WSGI/HTTP response body.
+    Memory use stays flat no matter how many users there are.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    for chunk in FORMATS[fmt](db.iter_leaderboard()):
+        yield chunk.encode(encoding) if encoding else chunk
+
+def export_leaderboard(db, fp, fmt='jsonl'):
+    """
+    Write the leaderboard to an open text file; returns the number of rows
+    """
+    count = 0
+    for chunk in stream_leaderboard(db, fmt):
+        fp.write(chunk)
+        count += 1
+    # The CSV header is a chunk of its own
+    return count - 1 if fmt == 'csv' else count
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the CYBERWOLF leaderboard")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="jsonl")
+    parser.add_argument("--output", "-o", help="output file (default: stdout)")
+    args = parser.parse_args()
+    
+    db = open_database()
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            count = export_leaderboard(db, f, args.format)
+        print(f"Exported {count} rows to {args.output}")
+    else:
+        export_leaderboard(db, sys.stdout, args.format)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import bisect
+from itertools import islice
+
+def leaderboard_entry(email, record):
+    """
+    Build the public leaderboard row for one stored UserRecord
+    """
+    return {
+        'email': email,
+        'health_score': record.health_score if record.health_score is not None else 0,
+        'completed_challenges': record.completed_count,
+        'current_challenge': record.current_challenge if record.current_challenge is not None else 1
+    }
+
+class LeaderboardIndex:
+    """
+    In-memory ranking ordered by (completed challenges, health_score), both descending.
+    
+    Users sharing a score key live in one bucket ordered by when they were
+    first seen, which reproduces the stable sort over user_data.json. Bucket
+    sizes are kept in a Fenwick tree over the distinct keys, so rank lookups
+    and page offsets cost O(log K) for K distinct keys (at most a few hundred
+    for 10 challenges x 0-100 health) regardless of the number of users.
+    """
+    def __init__(self, items=()):
+        self._keys = []       # distinct sort keys, best first
+        self._buckets = {}    # key -> sorted list of first-seen sequence numbers
+        self._tree = [0]      # Fenwick tree of bucket sizes, 1-based
+        self._users = {}      # email -> (key, seq, entry)
+        self._emails = {}     # seq -> email
+        self._next_seq = 0
+        for email, record in items:
+            self.update(email, record)
+    
+    def __len__(self):
+        return len(self._users)
+    
+    @staticmethod
+    def _key(entry):
+        return (-entry['completed_challenges'], -entry['health_score'])
+    
+    def update(self, email, record):
+        """
+        Insert or move one user after their record changed
+        """
+        entry = leaderboard_entry(email, record)
+        key = self._key(entry)
+        current = self._users.get(email)
+        
+        if current is not None:
+            old_key, seq, _ = current
+            if old_key == key:
+                self._users[email] = (key, seq, entry)
+                return
+            bucket = self._buckets[old_key]
+            del bucket[bisect.bisect_left(bucket, seq)]
+            self._add(self._position(old_key), -1)
+        else:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._emails[seq] = email
+        
+        if key not in self._buckets:
+            self._insert_key(key)
+        bisect.insort(self._buckets[key], seq)
+        self._add(self._position(key), 1)
+        self._users[email] = (key, seq, entry)
+    
+    def get_rank(self, email):
+        """
+        1-based competition rank (ties share a rank); None for unknown users
+        """
+        current = self._users.get(email)
+        if current is None:
+            return None
+        return self._prefix(self._position(current[0]) - 1) + 1
+    
+    def get_leaderboard(self, limit=None, offset=0):
+        """
+        Leaderboard rows in ranking order, sliced without touching earlier buckets
+        """
+        offset = max(0, offset)
+        if offset >= len(self._users) or limit == 0:
+            return []
+        
+        # Locate the bucket holding the row at `offset`
+        position = self._search(offset)
+        skip = offset - self._prefix(position - 1)
+        
+        rows = []
+        for key in islice(self._keys, position - 1, None):
+            bucket = self._buckets[key]
+            for i in range(skip, len(bucket)):
+                rows.append(dict(self._users[self._emails[bucket[i]]][2]))
+                if limit is not None and len(rows) >= limit:
+                    return rows
+            skip = 0
+        return rows
+    
+    def _position(self, key):
+        return bisect.bisect_left(self._keys, key) + 1
+    
+    def _insert_key(self, key):
+        # New distinct keys are rare (bounded by the score domain), so the
+        # Fenwick tree is simply rebuilt over the enlarged key list.
+        bisect.insort(self._keys, key)
+        self._buckets[key] = []
+        self._tree = [0] * (len(self._keys) + 1)
+        for i, k in enumerate(self._keys, 1):
+            self._add(i, len(self._buckets[k]))
+    
+    def _add(self, i, delta):
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+    
+    def _prefix(self, i):
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+    
+    def _search(self, offset):
+        """
+        Smallest 1-based position whose prefix sum exceeds offset
+        """
+        position = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = position + step
+            if nxt < len(self._tree) and self._tree[nxt] <= offset:
+                position = nxt
+                offset -= self._tree[nxt]
+            step >>= 1
+        return position + 1
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+import metrics
+
+# How often a view may ask the store whether progress changed, in seconds
+REFRESH_SECONDS = float(os.getenv("CYBERWOLF_LEADERBOARD_REFRESH", "3"))
+
+class LeaderboardSnapshot:
+    """
+    The ranking at one store version, with its markup already rendered.
+    Never modified once built, so any number of viewers can share it.
+    """
+    __slots__ = ('version', 'generation', 'rows', 'html', 'built_at')
+    
+    def __init__(self, version, generation, rows, html, built_at):
+        self.version = version
+        self.generation = generation
+        self.rows = rows
+        self.html = html
+        self.built_at = built_at
+
+class LeaderboardCache:
+    """
+    Process-wide leaderboard snapshot shared by every viewer.
+    
+    A view normally just returns the current snapshot. At most once every
+    `refresh` seconds one viewer checks the store's version (Database.get_version);
+    the top `limit` rows are re-read and re-rendered only when it changed.
+    Other viewers keep getting the old snapshot while that happens.
+    """
+    def __init__(self, db, render, limit=100, refresh=REFRESH_SECONDS):
+        self.db = db
+        self.render = render
+        self.limit = limit
+        self.refresh = refresh
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'views': 0, 'version_checks': 0, 'rebuilds': 0}
+        metrics.register_stats("leaderboard", self.get_stats, gauges=('generation', 'rows', 'age_seconds'))
+    
+    def get(self):
+        self._stats['views'] += 1  # approximate under contention; it's only a metric
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.refresh:
+            return snapshot
+        
+        # Only one viewer refreshes; the rest serve what is already there
+        if not self._lock.acquire(blocking=snapshot is None):
+            return snapshot
+        try:
+            if self._snapshot is not None and time.monotonic() - self._checked_at < self.refresh:
+                return self._snapshot
+            self._checked_at = time.monotonic()
+            self._stats['version_checks'] += 1
+            
+            version = self.db.get_version()
+            snapshot = self._snapshot
+            # A store that cannot report a version is re-read every `refresh` seconds
+            if snapshot is None or version is None or version != snapshot.version:
+                rows = self.db.get_leaderboard(self.limit)
+                generation = snapshot.generation + 1 if snapshot is not None else 1
+                snapshot = LeaderboardSnapshot(version, generation, rows, self.render(rows), time.time())
+                self._snapshot = snapshot
+                self._stats['rebuilds'] += 1
+            return snapshot
+        finally:
+            self._lock.release()
+    
+    def get_stats(self):
+        stats = dict(self._stats)
+        snapshot = self._snapshot
+        stats['generation'] = snapshot.generation if snapshot is not None else 0
+        stats['rows'] = len(snapshot.rows) if snapshot is not None else 0
+        stats['age_seconds'] = time.time() - snapshot.built_at if snapshot is not None else 0.0
+        return stats
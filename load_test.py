@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from itertools import cycle
+
+from websockets.asyncio.client import connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from cluster import wait_until_listening
+
+# Demo accounts (see FirebaseAuth.authenticate_user), which log in without
+# reaching Firebase; sessions take turns using them
+ACCOUNTS = (
+    ("demo@cyberwolf.com", "demo123"),
+    ("test@cyberwolf.com", "test123"),
+    ("agent@cyberwolf.com", "cyberwolf2024"),
+)
+
+# What an agent does once logged in: open the first challenge, then either ask
+# for a hint (a progress write and a full rerun) or submit the empty form (a
+# rejected submission, rerunning only the dialog)
+ACTIONS = ('hint_1', 'submit_challenge_1')
+
+async def fetch_cookie(host, port):
+    """
+    Load the page once, as a browser would, and return the proxy's sticky cookie
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET / HTTP/1.1\r\nHost: {host}:{port}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    head = await reader.readuntil(b"\r\n\r\n")
+    writer.close()
+    cookies = []
+    for line in head.decode('latin-1').split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "set-cookie":
+            cookies.append(value.strip().split(";")[0])
+    return "; ".join(cookies)
+
+async def run_script(ws, widget_states=(), fragment_id=""):
+    """
+    Request a rerun and wait until it finishes, following any st.rerun() it
+    makes; returns {widget key: (widget id, fragment id)} for the widgets drawn
+    """
+    msg = BackMsg()
+    msg.rerun_script.query_string = ""
+    msg.rerun_script.page_script_hash = ""
+    msg.rerun_script.fragment_id = fragment_id
+    msg.rerun_script.widget_states.widgets.extend(widget_states)
+    await ws.send(msg.SerializeToString())
+    
+    widgets = {}
+    while True:
+        forward = ForwardMsg()
+        forward.ParseFromString(await ws.recv())
+        kind = forward.WhichOneof('type')
+        if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+            element = forward.delta.new_element
+            widget_id = getattr(getattr(element, element.WhichOneof('type')), 'id', "")
+            if widget_id:
+                # Widget IDs end in the widget's key: $$ID-<hash>-<key>
+                widgets[widget_id.split("-", 2)[-1]] = (widget_id, forward.delta.fragment_id)
+        elif kind == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+            return widgets
+
+async def press(ws, widgets, key):
+    """
+    Click a button as the browser would: in the fragment that drew it
+    """
+    widget_id, fragment_id = widgets[key]
+    return await run_script(ws, [WidgetState(id=widget_id, trigger_value=True)], fragment_id)
+
+async def run_session(host, port, deadline, latencies, account):
+    """
+    One simulated agent: open a Streamlit session through the proxy, log in,
+    then work on a challenge back to back until `deadline`, recording each
+    rerun's time
+    """
+    cookie = await fetch_cookie(host, port)
+    async with connect(
+        f"ws://{host}:{port}/_stcore/stream",
+        subprotocols=["streamlit"],
+        additional_headers={"Cookie": cookie} if cookie else None,
+        max_size=None
+    ) as ws:
+        email, password = account
+        widgets = await run_script(ws)
+        started = time.perf_counter()
+        page = await run_script(ws, [
+            WidgetState(id=widgets['email_input'][0], string_value=email),
+            WidgetState(id=widgets['password_input'][0], string_value=password),
+            WidgetState(id=widgets['login_btn'][0], trigger_value=True),
+        ])
+        latencies.append(time.perf_counter() - started)
+        if 'challenge_1' not in page:
+            raise RuntimeError(f"Login as {email} failed")
+        
+        for action in cycle(ACTIONS):
+            if time.monotonic() >= deadline:
+                break
+            started = time.perf_counter()
+            dialog = await press(ws, page, 'challenge_1')
+            latencies.append(time.perf_counter() - started)
+            
+            started = time.perf_counter()
+            await press(ws, dialog, action)
+            latencies.append(time.perf_counter() - started)
+
+async def load(host, port, sessions, duration):
+    """
+    Run `sessions` concurrent agents for `duration` seconds; returns
+    (reruns per second, p50 seconds, p95 seconds), the latter None if no
+    rerun finished
+    """
+    latencies = []
+    deadline = time.monotonic() + duration
+    started = time.monotonic()
+    results = await asyncio.gather(
+        *(run_session(host, port, deadline, latencies, ACCOUNTS[i % len(ACCOUNTS)]) for i in range(sessions)),
+        return_exceptions=True
+    )
+    elapsed = time.monotonic() - started
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        print(f"{len(errors)} sessions failed, e.g. {errors[0]!r}")
+    if not latencies:
+        return 0.0, None, None
+    latencies.sort()
+    return (len(latencies) / elapsed,
+            latencies[len(latencies) // 2],
+            latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))])
+
+def format_ms(seconds, width=0):
+    return f"{seconds * 1000:>{width}.0f}" if seconds is not None else f"{'-':>{width}}"
+
+def spawn_cluster(workers, port, worker_port, server_port):
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(here, "cluster.py"), "--workers", str(workers),
+         "--host", "127.0.0.1", "--port", str(port),
+         "--worker-port", str(worker_port), "--server-port", str(server_port)],
+        cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    workers_up = wait_until_listening([("127.0.0.1", worker_port + i) for i in range(workers)], timeout=120)
+    if not workers_up or not wait_until_listening([("127.0.0.1", port)], timeout=30):
+        process.send_signal(signal.SIGTERM)
+        raise RuntimeError(f"Cluster with {workers} workers did not come up")
+    return process
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how concurrent app sessions scale with worker count")
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts to launch and compare with 1 worker")
+    parser.add_argument("--target", help="host:port of a running proxy to test instead of launching clusters")
+    parser.add_argument("--sessions", type=int, default=32, help="concurrent simulated agents")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per measurement")
+    parser.add_argument("--port", type=int, default=8590, help="proxy port for launched clusters")
+    args = parser.parse_args()
+    
+    if args.target:
+        host, _, port = args.target.rpartition(':')
+        throughput, p50, p95 = asyncio.run(load(host or "127.0.0.1", int(port), args.sessions, args.duration))
+        print(f"{throughput:.1f} reruns/s, p50 {format_ms(p50)} ms, p95 {format_ms(p95)} ms")
+        return
+    
+    # Speedup is always relative to a single worker, measured first
+    counts = sorted({1} | {int(n) for n in args.workers.split(",")})
+    baseline = None
+    print(f"{args.sessions} concurrent sessions, {args.duration:.0f}s each ({os.cpu_count()} CPUs)")
+    print(f"{'workers':>7} {'reruns/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'speedup':>8}")
+    for workers in counts:
+        process = spawn_cluster(workers, args.port, args.port + 100, args.port + 99)
+        try:
+            # A short warm-up so first-run imports and caches are not measured
+            asyncio.run(load("127.0.0.1", args.port, workers, 2.0))
+            throughput, p50, p95 = asyncio.run(load("127.0.0.1", args.port, args.sessions, args.duration))
+        finally:
+            process.send_signal(signal.SIGTERM)
+            process.wait()
+        if baseline is None:
+            baseline = throughput or None
+        speedup = throughput / baseline if baseline else 0.0
+        print(f"{workers:>7} {throughput:>9.1f} {format_ms(p50, 7)} {format_ms(p95, 7)} {speedup:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
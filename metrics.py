@@ -0,0 +1,212 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow AI calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """
+    Prometheus-style histogram: per-bucket counts plus a running sum and count
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+    
+    def snapshot(self):
+        """
+        (cumulative bucket counts, sum, count), as the exposition format wants them
+        """
+        with self._lock:
+            cumulative = []
+            total = 0
+            for n in self.counts:
+                total += n
+                cumulative.append(total)
+            return cumulative, self.sum, self.count
+
+_spans = {}
+_spans_lock = threading.Lock()
+_stats_sources = {}  # prefix -> (get_stats, gauge keys)
+
+def _histogram(name):
+    histogram = _spans.get(name)
+    if histogram is None:
+        with _spans_lock:
+            histogram = _spans.setdefault(name, Histogram())
+    return histogram
+
+def observe(name, seconds):
+    _histogram(name).observe(seconds)
+
+@contextmanager
+def span(name):
+    """
+    Time the enclosed block into the `name` histogram; exceptions (including
+    Streamlit's rerun/stop control flow) still record the time spent
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _histogram(name).observe(time.perf_counter() - started)
+
+def timed(name):
+    """
+    Decorator form of span(); inlined, since it wraps every Database call
+    """
+    def decorator(func):
+        histogram = _histogram(name)
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+class Instrumented:
+    """
+    Proxy that times calls to an object's methods as spans named
+    "<name>.<method>"; everything else passes straight through. With
+    `methods`, only those are timed, otherwise every public method is.
+    """
+    def __init__(self, target, name, methods=None):
+        self._target = target
+        self._name = name
+        self._methods = methods
+        self._wrapped = {}
+    
+    def __getattr__(self, attr):
+        wrapped = self._wrapped.get(attr)
+        if wrapped is not None:
+            return wrapped
+        value = getattr(self._target, attr)
+        if not callable(value) or attr.startswith('_') or (self._methods is not None and attr not in self._methods):
+            return value
+        wrapped = self._wrapped[attr] = timed(f"{self._name}.{attr}")(value)
+        return wrapped
+
+def instrument(target, name, methods=None):
+    return Instrumented(target, name, methods)
+
+def register_stats(prefix, get_stats, gauges=()):
+    """
+    Export a module's get_stats() dict: keys in `gauges` as gauges, the rest
+    as counters. Re-registering a prefix replaces it, so this is safe to call
+    on every rerun.
+    """
+    _stats_sources[prefix] = (get_stats, frozenset(gauges))
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render():
+    """
+    All metrics in the Prometheus text exposition format
+    """
+    lines = [
+        "# HELP cyberwolf_span_seconds Time spent in instrumented parts of a rerun",
+        "# TYPE cyberwolf_span_seconds histogram"
+    ]
+    with _spans_lock:
+        spans = sorted(_spans.items())
+    for name, histogram in spans:
+        cumulative, total, count = histogram.snapshot()
+        label = f'span="{_escape(name)}"'
+        for bound, n in zip(histogram.buckets, cumulative):
+            lines.append(f'cyberwolf_span_seconds_bucket{{{label},le="{bound}"}} {n}')
+        lines.append(f'cyberwolf_span_seconds_bucket{{{label},le="+Inf"}} {cumulative[-1]}')
+        lines.append(f'cyberwolf_span_seconds_sum{{{label}}} {total}')
+        lines.append(f'cyberwolf_span_seconds_count{{{label}}} {count}')
+    
+    for prefix, (get_stats, gauges) in sorted(_stats_sources.items()):
+        try:
+            stats = get_stats()
+        except Exception as e:
+            print(f"Error collecting {prefix} metrics: {e}")
+            continue
+        for key, value in sorted(stats.items()):
+            if not isinstance(value, (int, float)):
+                continue
+            if key in gauges:
+                metric, kind = f"cyberwolf_{prefix}_{key}", "gauge"
+            else:
+                metric, kind = f"cyberwolf_{prefix}_{key}_total", "counter"
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path):
+    """
+    Atomically write the metrics to `path` (e.g. for node_exporter's textfile collector)
+    """
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would flood the app's log
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+def start_exporter():
+    """
+    Start exporting once per process, as configured by the environment:
+    CYBERWOLF_METRICS_PORT serves /metrics over HTTP, CYBERWOLF_METRICS_FILE
+    is rewritten every CYBERWOLF_METRICS_INTERVAL seconds (default 15)
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    
+    port = os.getenv("CYBERWOLF_METRICS_PORT")
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        except OSError as e:
+            print(f"Error starting metrics endpoint on port {port}: {e}")
+    
+    path = os.getenv("CYBERWOLF_METRICS_FILE")
+    if path:
+        interval = float(os.getenv("CYBERWOLF_METRICS_INTERVAL", "15"))
+        def write_periodically():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_textfile(path)
+                except OSError as e:
+                    print(f"Error writing metrics file: {e}")
+        threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
@@ -0,0 +1,204 @@
+import atexit
+import os
+import threading
+import time
+
+import metrics
+
+# Set to 0 to save progress synchronously inside the handler instead
+ASYNC_WRITES = os.getenv("CYBERWOLF_DB_ASYNC_WRITES", "1") == "1"
+
+# Most users written by one save_many; retries of a failed batch go out in
+# batches half as large per failure
+BATCH_SIZE = int(os.getenv("CYBERWOLF_DB_QUEUE_BATCH", "200"))
+MAX_RETRY_DELAY = 30.0
+
+class PersistenceQueue:
+    """
+    Write-behind queue for session progress.
+    
+    Handlers enqueue a user's latest progress and return at once; one worker
+    thread saves whatever is queued with a single save_many per database.
+    Updates for a user that arrive before the worker gets to them are
+    coalesced, so only the newest is written. Until a write lands, get()
+    returns the queued progress, which gives a session (or a re-login right
+    after logout) read-your-writes.
+    
+    Users whose write failed are retried with exponential backoff, in smaller
+    batches each time, so a batch the database rejects as a whole (e.g. too
+    large for the progress server) is split until it goes through.
+    """
+    def __init__(self, retry_delay=0.5, batch_size=BATCH_SIZE):
+        self.retry_delay = retry_delay
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        # (id(db), email) -> (db, email, progress, enqueued_at, failed attempts, retry at)
+        self._pending = {}
+        self._inflight = {}  # the batch the worker is writing right now
+        self._thread = None
+        self._closed = False
+        self._stats = {'enqueued': 0, 'coalesced': 0, 'written': 0, 'batches': 0, 'failures': 0}
+        # Seconds from a change being queued to it being written
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latency_last = 0.0
+    
+    def put(self, db, email, progress):
+        """
+        Queue `progress` (the save_many fields) for `email`
+        """
+        if self._closed:
+            return db.save_many({email: progress})
+        
+        with self._cond:
+            key = (id(db), email)
+            queued = self._pending.get(key)
+            if queued is not None:
+                self._stats['coalesced'] += 1
+            if queued is not None:
+                # Latency counts from the oldest change not yet written, and
+                # a user backing off after a failure keeps backing off
+                self._pending[key] = (db, email, progress) + queued[3:]
+            else:
+                self._pending[key] = (db, email, progress, time.monotonic(), 0, 0.0)
+            self._stats['enqueued'] += 1
+            
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="persistence-queue", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            self._cond.notify_all()
+        return True
+    
+    def get(self, db, email):
+        """
+        Progress queued or being written for `email`, or None if nothing is
+        outstanding and the database is current
+        """
+        key = (id(db), email)
+        with self._cond:
+            queued = self._pending.get(key) or self._inflight.get(key)
+            if queued is None:
+                return None
+            return dict(queued[2], completed_challenges=list(queued[2]['completed_challenges']))
+    
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued so far is written; False on timeout
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._inflight, timeout)
+    
+    def wait_for(self, db, email, timeout=None):
+        """
+        Wait until nothing is queued or being written for `email`, however it
+        was queued; False on timeout
+        """
+        key = (id(db), email)
+        with self._cond:
+            return self._cond.wait_for(lambda: key not in self._pending and key not in self._inflight, timeout)
+    
+    def close(self, timeout=10.0):
+        """
+        Drain the queue (called at interpreter exit); later puts write directly
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if not self.flush(timeout):
+            print(f"Error saving progress: {self.depth()} updates still queued at shutdown")
+    
+    def depth(self):
+        with self._cond:
+            return len(self._pending) + len(self._inflight)
+    
+    def get_stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._pending) + len(self._inflight)
+            written = stats['written']
+            stats['flush_latency_last'] = self._latency_last
+            stats['flush_latency_max'] = self._latency_max
+            stats['flush_latency_mean'] = self._latency_total / written if written else 0.0
+            return stats
+    
+    def _next_batch(self):
+        """
+        Take the next batch of users that are not backing off out of
+        `_pending`. Caller holds `_cond`.
+        """
+        now = time.monotonic()
+        batch = {}
+        limit = self.batch_size
+        for key, item in self._pending.items():
+            if item[5] > now:
+                continue
+            limit = min(limit, max(1, self.batch_size >> item[4]))
+            if len(batch) >= limit:
+                break
+            batch[key] = item
+        for key in batch:
+            del self._pending[key]
+        return batch
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._pending:
+                        if self._closed:
+                            return
+                        self._cond.wait()
+                        continue
+                    batch = self._next_batch()
+                    if batch:
+                        break
+                    # Everything queued is backing off after a failure
+                    self._cond.wait(min(item[5] for item in self._pending.values()) - time.monotonic())
+                self._inflight = batch
+            
+            by_db = {}
+            for key, (db, email, progress, *_) in batch.items():
+                by_db.setdefault(id(db), (db, {}))[1][email] = progress
+            
+            failed = set()
+            for db_id, (db, progress) in by_db.items():
+                try:
+                    saved = db.save_many(progress)
+                except Exception as e:
+                    print(f"Error saving progress: {e}")
+                    saved = False
+                if not saved:
+                    failed.add(db_id)
+            
+            now = time.monotonic()
+            with self._cond:
+                for key, item in batch.items():
+                    if key[0] in failed:
+                        # Back off, keeping a newer update queued meanwhile
+                        attempts = item[4] + 1
+                        retry_at = now + min(self.retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+                        self._pending[key] = self._pending.get(key, item)[:4] + (attempts, retry_at)
+                        continue
+                    latency = now - item[3]
+                    self._latency_last = latency
+                    self._latency_max = max(self._latency_max, latency)
+                    self._latency_total += latency
+                    self._stats['written'] += 1
+                self._stats['batches'] += 1
+                self._stats['failures'] += len(failed)
+                self._inflight = {}
+                self._cond.notify_all()
+
+_queue = PersistenceQueue()
+
+def get_queue():
+    """
+    The process-wide queue shared by every session
+    """
+    return _queue
+
+metrics.register_stats(
+    "persistence_queue", _queue.get_stats,
+    gauges=('depth', 'flush_latency_last', 'flush_latency_max', 'flush_latency_mean')
+)
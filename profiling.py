@@ -0,0 +1,261 @@
+import argparse
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Profiles and the request file live here; the app checks the request file
+# at most once a second, so idle overhead is one stat() per second
+PROFILE_DIR = os.getenv("CYBERWOLF_PROFILE_DIR", "profiles")
+REQUEST_FILE = "request.json"
+MODES = ('cprofile', 'sample')
+SAMPLE_INTERVAL = 0.005
+
+_SESSION_KEY = '_profiling'
+
+_request = None       # the newest request seen, as loaded from the request file
+_request_mtime = None
+_checked_at = 0.0
+_claims = {}          # request id -> session ids that took it (at most one, unless user is "*")
+_lock = threading.Lock()
+
+def request_profile(reruns, user=None, mode='cprofile'):
+    """
+    Ask running app processes to profile the next `reruns` reruns of one
+    session: the next session of `user`, any user's next session if None, or
+    every session if "*". Replaces any earlier request; deleting the request
+    file cancels it. The apps must share this process's PROFILE_DIR.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown profiling mode: {mode}")
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    request = {'id': f"{time.time():.6f}", 'reruns': reruns, 'user': user, 'mode': mode}
+    path = os.path.join(PROFILE_DIR, REQUEST_FILE)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(request, f)
+    os.replace(tmp, path)
+    return request
+
+def _env_request():
+    # CYBERWOLF_PROFILE_RERUNS=N [CYBERWOLF_PROFILE_USER=email] profiles from startup
+    reruns = int(os.getenv("CYBERWOLF_PROFILE_RERUNS", "0"))
+    if reruns <= 0:
+        return None
+    return {'id': "env", 'reruns': reruns, 'user': os.getenv("CYBERWOLF_PROFILE_USER") or None,
+            'mode': os.getenv("CYBERWOLF_PROFILE_MODE", "cprofile")}
+
+_ENV_REQUEST = _env_request()
+
+def _current_request():
+    global _request, _request_mtime, _checked_at
+    now = time.monotonic()
+    with _lock:
+        if now - _checked_at < 1.0:
+            return _request
+        _checked_at = now
+        try:
+            mtime = os.stat(os.path.join(PROFILE_DIR, REQUEST_FILE)).st_mtime
+        except OSError:
+            # No request file (any more): deleting it cancels the request
+            _request = None
+            _request_mtime = None
+            return None
+        if mtime != _request_mtime:
+            _request_mtime = mtime
+            try:
+                with open(os.path.join(PROFILE_DIR, REQUEST_FILE), encoding='utf-8') as f:
+                    _request = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error reading profiling request: {e}")
+        return _request
+
+def _claim(request, session_id):
+    """
+    Whether this session should act on `request`
+    """
+    user = request.get('user')
+    if user not in (None, "*") and st.session_state.get('user_email') != user:
+        return False
+    with _lock:
+        sessions = _claims.setdefault(request['id'], set())
+        if session_id in sessions:
+            return True
+        if sessions and user != "*":
+            return False
+        sessions.add(session_id)
+        return True
+
+def _widget_ids_this_run(ctx):
+    # Streamlit 1.49 keeps these on the context; later releases on ctx.shared
+    ids = getattr(ctx, 'widget_ids_this_run', None)
+    return ids if ids is not None else ctx.shared.widget_ids_this_run.snapshot()
+
+def _widget_values(ctx, widget_ids):
+    """
+    Cheap comparable snapshot of the given widgets' values, keyed by widget
+    ID, so the next run can tell which widget triggered it. IDs rather than
+    session_state keys, so unkeyed widgets (e.g. the LOGOUT button) count too.
+    """
+    values = {}
+    for widget_id in widget_ids:
+        try:
+            value = ctx.session_state[widget_id]
+        except KeyError:
+            continue
+        if value is None or isinstance(value, (bool, int, float, str)):
+            values[widget_id] = value
+        elif isinstance(value, (list, tuple, set)) and len(value) < 100:
+            values[widget_id] = repr(sorted(value, key=repr) if isinstance(value, set) else value)
+        else:
+            values[widget_id] = f"<{type(value).__name__} {id(value):x}>"
+    return values
+
+def run(main):
+    """
+    Run one rerun of `main`, under a profiler if this session was asked for it
+    """
+    request = _current_request() or _ENV_REQUEST
+    ctx = get_script_run_ctx()
+    if request is None or ctx is None:
+        return main()
+    
+    state = st.session_state.get(_SESSION_KEY)
+    if state is None or state['request'] != request['id']:
+        if not _claim(request, ctx.session_id):
+            return main()
+        # Arm: this run only records a baseline, so that each profiled run
+        # can report what the user changed to trigger it
+        state = {'request': request['id'], 'remaining': request['reruns'], 'values': None}
+        st.session_state[_SESSION_KEY] = state
+        try:
+            return main()
+        finally:
+            state['values'] = _widget_values(ctx, _widget_ids_this_run(ctx))
+    
+    if state['remaining'] <= 0:
+        return main()
+    
+    # Only widgets drawn by earlier runs can have been used; widget IDs end
+    # in the widget's key ($$ID-<hash>-<key>, "None" if it has none)
+    previous = state['values'] or {}
+    current = _widget_values(ctx, previous)
+    # Buttons read True only in the run they trigger, so falling back to
+    # False is not a user action
+    trigger = sorted(
+        widget_id for widget_id, value in current.items()
+        if previous[widget_id] != value and not (previous[widget_id] is True and value is False)
+    )
+    state['remaining'] -= 1
+    index = request['reruns'] - state['remaining']
+    
+    profile = _start(request.get('mode', 'cprofile'))
+    started = time.perf_counter()
+    try:
+        return main()
+    finally:
+        elapsed = time.perf_counter() - started
+        _stop(profile)
+        # Merged, since a fragment rerun only draws the fragment's widgets
+        state['values'] = {**current, **_widget_values(ctx, _widget_ids_this_run(ctx))}
+        _save(profile, {
+            'request': request['id'],
+            'session': ctx.session_id,
+            'user': st.session_state.get('user_email'),
+            'rerun': index,
+            'of': request['reruns'],
+            'trigger': trigger,
+            'seconds': elapsed,
+            'mode': profile[0],
+            'time': time.time()
+        })
+
+def _start(mode):
+    if mode == 'sample':
+        sampler = _Sampler(threading.get_ident())
+        sampler.start()
+        return ('sample', sampler)
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError as e:
+        # Another profiler is active in this interpreter (Python 3.12+ allows one)
+        print(f"Error starting profiler: {e}")
+        return ('none', None)
+    return ('cprofile', profiler)
+
+def _stop(profile):
+    mode, profiler = profile
+    if mode == 'cprofile':
+        profiler.disable()
+    elif mode == 'sample':
+        profiler.stop()
+
+def _save(profile, info):
+    mode, profiler = profile
+    if mode == 'none':
+        return
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{info['time']:.0f}-{info['session'][:8]}-{info['rerun']}")
+        if mode == 'cprofile':
+            profiler.dump_stats(base + ".pstats")
+        else:
+            with open(base + ".collapsed", 'w', encoding='utf-8') as f:
+                for stack, count in profiler.samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        with open(base + ".json", 'w', encoding='utf-8') as f:
+            json.dump(info, f, indent=2)
+    except OSError as e:
+        print(f"Error saving profile: {e}")
+
+class _Sampler(threading.Thread):
+    """
+    Samples one thread's stack every SAMPLE_INTERVAL seconds into collapsed
+    stack counts ("outer;inner count" lines, as flamegraph tools read them)
+    """
+    def __init__(self, thread_id):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self._stopped = threading.Event()
+    
+    def run(self):
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+    
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Profile the next reruns of a live app session",
+        epilog="The request and the profiles go to CYBERWOLF_PROFILE_DIR (default: profiles), "
+               "which must be the same directory the app processes use"
+    )
+    parser.add_argument("reruns", type=int, help="how many reruns to profile")
+    parser.add_argument("--user", help="profile this user's session; '*' for every session (default: the next session)")
+    parser.add_argument("--mode", choices=MODES, default='cprofile',
+                        help="cprofile writes .pstats; sample writes collapsed stacks with lower overhead")
+    args = parser.parse_args()
+    
+    request = request_profile(args.reruns, args.user, args.mode)
+    print(f"Requested {args.reruns} profiled reruns ({args.mode}); profiles will appear in {PROFILE_DIR}/")
+    print(json.dumps(request))
+
+if __name__ == "__main__":
+    main()
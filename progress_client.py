@@ -0,0 +1,232 @@
+import json
+import queue
+import socket
+import threading
+import time
+from itertools import count
+
+from database import CorruptDataError
+
+# What each operation returns when the server cannot be reached, matching
+# the local Database's behaviour on errors
+FAILURE_RESULTS = {
+    'get_user_data': None,
+    'save_user_data': False,
+    'reset_user_progress': False,
+    'get_many': {},
+    'save_many': False,
+    'reset_many': [],
+    'get_leaderboard': [],
+    'get_rank': None,
+    'get_version': None,
+    'get_events_version': None,
+    'export_columns': None,
+    'export_event_columns': None,
+    'record_event': False,
+    'get_challenge_stats': None,
+    'compact': False,
+}
+
+# Appending an event twice would double-count it, so these are only retried
+# when the request never reached the server
+NOT_IDEMPOTENT = ('record_event',)
+
+class _Connection:
+    def __init__(self, address, timeout, token=None, admin_token=None):
+        self.sock = socket.create_connection(address, timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        
+        # Every connection opens with the shared secret (see ProgressServer)
+        hello = {'auth': token, 'admin': admin_token}
+        self.sock.sendall((json.dumps(hello) + "\n").encode('utf-8'))
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Progress server closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            self.close()
+            # Not an OSError: retrying with the same token would not help
+            raise RuntimeError(f"Progress server refused the connection: {response['error']}")
+    
+    def call_many(self, requests):
+        """
+        Pipeline requests: send them all, then collect the responses by id
+        """
+        payload = "".join(json.dumps(request, separators=(',', ':')) + "\n" for request in requests)
+        self.sock.sendall(payload.encode('utf-8'))
+        
+        pending = {request['id'] for request in requests}
+        responses = {}
+        while pending:
+            line = self.reader.readline()
+            if not line:
+                raise ConnectionError("Progress server closed the connection")
+            response = json.loads(line)
+            if response.get('id') is None and 'error' in response:
+                # The server could not read a request (e.g. it was too large)
+                # and is closing the connection; retrying would not help
+                self.close()
+                raise RuntimeError(response['error'])
+            pending.discard(response['id'])
+            responses[response['id']] = response
+        return [responses[request['id']] for request in requests]
+    
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+class RemoteDatabase:
+    """
+    Database interface backed by a progress server (see progress_server.py).
+    
+    Connections are pooled and shared by all sessions in the process; each
+    call checks one out, so concurrent sessions never interleave on a socket.
+    Failed connections are dropped and the call is retried with backoff.
+    """
+    def __init__(self, address, pool_size=8, timeout=5.0, retries=2, token=None, admin_token=None):
+        if isinstance(address, str):
+            host, _, port = address.rpartition(':')
+            address = (host or "127.0.0.1", int(port))
+        self.address = address
+        self.timeout = timeout
+        self.retries = retries
+        self.token = token
+        self.admin_token = admin_token
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._ids = count()
+        self._ids_lock = threading.Lock()
+    
+    def get_user_data(self, email):
+        return self._call('get_user_data', email)
+    
+    def save_user_data(self, email, health_score, completed_challenges, current_challenge, user_score=0):
+        return self._call('save_user_data', email, health_score, list(completed_challenges), current_challenge, user_score)
+    
+    def reset_user_progress(self, email):
+        return self._call('reset_user_progress', email)
+    
+    def get_many(self, emails):
+        return self._call('get_many', list(emails))
+    
+    def save_many(self, progress):
+        return self._call('save_many', progress)
+    
+    def reset_many(self, emails):
+        return self._call('reset_many', list(emails))
+    
+    def get_leaderboard(self, limit=None, offset=0):
+        return self._call('get_leaderboard', limit, offset)
+    
+    def iter_leaderboard(self, batch_size=1000):
+        """
+        Yield leaderboard rows page by page
+        """
+        offset = 0
+        while True:
+            page = self.get_leaderboard(batch_size, offset)
+            if not page:
+                return
+            yield from page
+            offset += len(page)
+    
+    def get_rank(self, email):
+        return self._call('get_rank', email)
+    
+    def get_version(self):
+        return self._call('get_version')
+    
+    def get_events_version(self):
+        return self._call('get_events_version')
+    
+    def export_columns(self):
+        return self._call('export_columns')
+    
+    def export_event_columns(self):
+        return self._call('export_event_columns')
+    
+    def record_event(self, email, event_type, challenge_num, amount=None):
+        return self._call('record_event', email, event_type, challenge_num, amount)
+    
+    def get_challenge_stats(self, challenge_num=None):
+        return self._call('get_challenge_stats', challenge_num)
+    
+    def compact(self):
+        return self._call('compact')
+    
+    def pipeline(self, calls):
+        """
+        Send several (op, args) calls in one round trip on one connection;
+        returns their results in order
+        """
+        requests = [self._request(op, *args) for op, args in calls]
+        try:
+            responses = self._send(requests, retry=all(op not in NOT_IDEMPOTENT for op, _ in calls))
+        except Exception as e:
+            print(f"Error calling progress server: {e}")
+            return [FAILURE_RESULTS.get(op) for op, _ in calls]
+        return [self._result(response, op) for response, (op, _) in zip(responses, calls)]
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+    
+    def _call(self, op, *args):
+        try:
+            response, = self._send([self._request(op, *args)], retry=op not in NOT_IDEMPOTENT)
+        except Exception as e:
+            print(f"Error calling progress server ({op}): {e}")
+            return FAILURE_RESULTS.get(op)
+        return self._result(response, op)
+    
+    def _request(self, op, *args):
+        with self._ids_lock:
+            request_id = next(self._ids)
+        return {'id': request_id, 'op': op, 'args': list(args)}
+    
+    def _result(self, response, op):
+        if response.get('corrupt'):
+            raise CorruptDataError(response['error'])
+        if 'error' in response:
+            print(f"Error from progress server ({op}): {response['error']}")
+            return FAILURE_RESULTS.get(op)
+        return response['result']
+    
+    def _send(self, requests, retry=True):
+        attempt = 0
+        while True:
+            sent = False
+            with self._slots:
+                conn = None
+                try:
+                    conn = self._checkout()
+                    sent = True
+                    responses = conn.call_many(requests)
+                except (OSError, ValueError):
+                    if conn is not None:
+                        conn.close()
+                    # Most likely the server restarted, which leaves every
+                    # idle connection dead too
+                    self.close()
+                    # A request that may have reached the server is only
+                    # replayed when running it twice is harmless
+                    if attempt >= self.retries or (sent and not retry):
+                        raise
+                else:
+                    self._idle.put(conn)
+                    return responses
+            attempt += 1
+            time.sleep(0.05 * 2 ** attempt)
+    
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return _Connection(self.address, self.timeout, self.token, self.admin_token)
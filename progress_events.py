@@ -0,0 +1,287 @@
+import heapq
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+# start: a user opened a challenge; solve/hint/penalty mirror the game actions
+EVENT_TYPES = ('start', 'solve', 'hint', 'penalty')
+
+class RunningMedian:
+    """
+    Median of a growing sample kept in two heaps: O(log n) to add, O(1) to read
+    """
+    def __init__(self):
+        self._low = []    # lower half, negated (max-heap)
+        self._high = []   # upper half (min-heap)
+    
+    def __len__(self):
+        return len(self._low) + len(self._high)
+    
+    def add(self, value):
+        if self._low and value > -self._low[0]:
+            heapq.heappush(self._high, value)
+        else:
+            heapq.heappush(self._low, -value)
+        
+        # Keep the lower half equal in size or one larger
+        if len(self._low) > len(self._high) + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+        elif len(self._high) > len(self._low):
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+    
+    @property
+    def median(self):
+        if not self._low:
+            return None
+        if len(self._low) == len(self._high):
+            return (-self._low[0] + self._high[0]) / 2
+        return -self._low[0]
+
+class ChallengeStats:
+    """
+    Materialized numbers for one challenge, updated one event at a time
+    """
+    def __init__(self):
+        self.solves = 0
+        self.hints = 0
+        self.penalties = 0
+        self.hinted_solves = 0
+        self.time_to_solve = RunningMedian()
+    
+    def to_dict(self, challenge_num):
+        return {
+            'challenge': challenge_num,
+            'solves': self.solves,
+            'hints': self.hints,
+            'penalties': self.penalties,
+            # Seconds from the user's first start of the challenge to the solve
+            'median_time_to_solve': self.time_to_solve.median,
+            # Share of solves where the user took a hint on that challenge first
+            'hint_usage_rate': self.hinted_solves / self.solves if self.solves else 0.0
+        }
+
+class EventStats:
+    """
+    Aggregates folded from the event stream. Per-user state is only kept for
+    challenges a user has started but not yet solved.
+    """
+    def __init__(self):
+        self.challenges = {}
+        self.events = 0
+        self._started = {}    # (email, challenge) -> first start timestamp
+        self._hinted = set()  # (email, challenge) pairs that used a hint before solving
+    
+    def _challenge(self, challenge_num):
+        stats = self.challenges.get(challenge_num)
+        if stats is None:
+            stats = self.challenges[challenge_num] = ChallengeStats()
+        return stats
+    
+    def apply(self, event):
+        event_type = event['type']
+        key = (event['email'], event['challenge'])
+        stats = self._challenge(event['challenge'])
+        self.events += 1
+        
+        if event_type == 'start':
+            self._started.setdefault(key, event['ts'])
+        elif event_type == 'hint':
+            stats.hints += 1
+            self._hinted.add(key)
+        elif event_type == 'penalty':
+            stats.penalties += 1
+        elif event_type == 'solve':
+            stats.solves += 1
+            started = self._started.pop(key, None)
+            if started is not None:
+                stats.time_to_solve.add(max(0, event['ts'] - started))
+            if key in self._hinted:
+                self._hinted.discard(key)
+                stats.hinted_solves += 1
+
+class EventLog:
+    """
+    Append-only JSON Lines history of solves, hints and penalties.
+    
+    Aggregates are updated as lines are appended or, for other processes'
+    appends, picked up by tailing the file from the last offset read, so
+    reading them never rescans the history.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._offset = 0
+        self._stats = EventStats()
+        self.skipped_lines = 0
+    
+    def record(self, event_type, email, challenge_num, amount=None, ts=None):
+        """
+        Append one event; `amount` is the health points lost for hints and penalties
+        """
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        
+        event = {
+            'type': event_type,
+            'email': email,
+            'challenge': challenge_num,
+            'ts': ts if ts is not None else time.time()
+        }
+        if amount is not None:
+            event['amount'] = amount
+        line = json.dumps(event, separators=(',', ':')) + "\n"
+        
+        with self._lock, open(self.path, 'a+b') as log:
+            _flock(log, exclusive=True)
+            try:
+                torn = _repair_tail(log)
+                if torn:
+                    print(f"Warning: dropped an incomplete {torn}-byte event from the end of {self.path}")
+                log.write(line.encode('utf-8'))
+                log.flush()
+            finally:
+                _flock(log, unlock=True)
+            self._refresh()
+    
+    def challenge_stats(self, challenge_num):
+        with self._lock:
+            self._refresh()
+            stats = self._stats.challenges.get(challenge_num) or ChallengeStats()
+            return stats.to_dict(challenge_num)
+    
+    def all_stats(self):
+        with self._lock:
+            self._refresh()
+            return [self._stats.challenges[num].to_dict(num) for num in sorted(self._stats.challenges)]
+    
+    def version(self):
+        """
+        Opaque value that changes whenever an event is appended, by any process
+        """
+        with self._lock:
+            self._refresh()
+            return self._offset
+    
+    def iter_events(self):
+        """
+        Replay the full history in append order
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as log:
+            for line in log:
+                if not line.endswith(b"\n") or not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # counted by _refresh
+    
+    def load_events(self):
+        """
+        The full history as a list; parses the whole file in one json.loads
+        call, which is far faster than iter_events for bulk reads
+        """
+        try:
+            with open(self.path, 'rb') as log:
+                data = log.read()
+        except FileNotFoundError:
+            return []
+        # Leave out a last line that is still being written
+        lines = [line for line in data[:data.rfind(b"\n") + 1].split(b"\n") if line.strip()]
+        try:
+            return json.loads(b"[" + b",".join(lines) + b"]")
+        except ValueError:
+            pass
+        
+        # Some line is unreadable (e.g. torn by an older version); parse one by one
+        events = []
+        for line in lines:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+        print(f"Warning: skipped {len(lines) - len(events)} unreadable events in {self.path}")
+        return events
+    
+    def _refresh(self):
+        """
+        Fold in events appended since the last read. Caller holds `_lock`.
+        """
+        try:
+            log = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with log:
+            if os.fstat(log.fileno()).st_size < self._offset:
+                # The file was replaced or truncated; start over
+                self._offset = 0
+                self._stats = EventStats()
+            log.seek(self._offset)
+            for line in log:
+                # A line without its newline is still being written by someone else
+                if not line.endswith(b"\n"):
+                    break
+                self._offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    self._stats.apply(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    # e.g. a torn event that an older version appended onto
+                    self.skipped_lines += 1
+                    print(f"Warning: skipping unreadable event in {self.path}: {e}")
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+def get_event_log(path=None):
+    """
+    Process-wide EventLog for `path`, so every session shares one set of aggregates
+    """
+    path = os.path.abspath(path or os.getenv("CYBERWOLF_EVENTS_PATH", "progress_events.jsonl"))
+    with _logs_lock:
+        if path not in _logs:
+            _logs[path] = EventLog(path)
+        return _logs[path]
+
+def _flock(f, exclusive=False, unlock=False):
+    if fcntl is None:
+        return
+    if unlock:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+def _repair_tail(log):
+    """
+    Cut off a last line left without its newline by a writer that died
+    mid-append, as database.py does for its journal; otherwise the next event
+    would be glued onto it. The caller holds the exclusive lock. Returns the
+    number of bytes removed.
+    """
+    end = log.seek(0, os.SEEK_END)
+    if end == 0:
+        return 0
+    log.seek(end - 1)
+    if log.read(1) == b"\n":
+        return 0
+    
+    keep = 0
+    pos = end
+    while pos > 0:
+        start = max(0, pos - 65536)
+        log.seek(start)
+        newline = log.read(pos - start).rfind(b"\n")
+        if newline != -1:
+            keep = start + newline + 1
+            break
+        pos = start
+    log.truncate(keep)
+    return end - keep
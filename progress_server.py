@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import json
+import os
+import threading
+
+from database import CorruptDataError, Database
+
+# Database methods exposed over the wire; anything else is rejected
+OPERATIONS = (
+    'get_user_data', 'save_user_data', 'reset_user_progress',
+    'get_many', 'save_many', 'reset_many',
+    'get_leaderboard', 'get_rank', 'get_version', 'get_events_version',
+    'record_event', 'get_challenge_stats',
+)
+
+# These dump every user (emails included) or rewrite the whole store, so they
+# are only served to connections that present the admin token
+ADMIN_OPERATIONS = ('export_columns', 'export_event_columns', 'compact')
+
+# Shared secret every connection must present; required unless the server
+# only listens on loopback. App nodes that host the admin dashboard also
+# need the admin token.
+SERVER_TOKEN = os.getenv("CYBERWOLF_SERVER_TOKEN") or None
+ADMIN_TOKEN = os.getenv("CYBERWOLF_SERVER_ADMIN_TOKEN") or None
+
+# Longest request line accepted (asyncio's default is 64 KiB, which a
+# save_many of a few hundred users already exceeds)
+MAX_REQUEST_BYTES = int(os.getenv("CYBERWOLF_SERVER_MAX_REQUEST_BYTES", str(64 * 1024 * 1024)))
+
+class ProgressServer:
+    """
+    Serves one local Database to any number of app nodes.
+    
+    The protocol is JSON Lines over TCP. A connection starts with
+    {"auth": token, "admin": admin token or null}, answered by
+    {"id": null, "result": {"admin": bool}} or an error before hanging up.
+    Then each request is
+    {"id": n, "op": name, "args": [...], "kwargs": {...}} and each response is
+    {"id": n, "result": ...} or {"id": n, "error": message}. Requests on one
+    connection run concurrently, so a client may pipeline several and match
+    the responses, which can arrive out of order, by id. A request line longer
+    than MAX_REQUEST_BYTES gets {"id": null, "error": ...} and the connection
+    is closed.
+    """
+    def __init__(self, db=None, host="127.0.0.1", port=8765, token=SERVER_TOKEN, admin_token=ADMIN_TOKEN):
+        if token is None and not _is_loopback(host):
+            # Anyone on the event network could otherwise rewrite any player's progress
+            raise ValueError(f"Refusing to serve on {host} without CYBERWOLF_SERVER_TOKEN")
+        self.db = db if db is not None else Database()
+        self.token = token
+        self.admin_token = admin_token
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+    
+    async def serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port,
+                                                  limit=MAX_REQUEST_BYTES)
+        # Port 0 picks a free port; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass  # stop() was called
+    
+    def start_in_thread(self):
+        """
+        Run the server on a background thread (used for local testing);
+        returns the port it listens on
+        """
+        threading.Thread(target=lambda: asyncio.run(self.serve()), name="progress-server", daemon=True).start()
+        self._ready.wait()
+        return self.port
+    
+    def stop(self):
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+    
+    async def _handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            admin = await self._authenticate(reader, writer, write_lock)
+            while admin is not None:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    # Over MAX_REQUEST_BYTES. The rest of the line may still be
+                    # arriving, so the stream cannot be resynchronized: report
+                    # it (without an id, since the request was never parsed) and hang up
+                    await self._respond(writer, write_lock, {'id': None, 'error': f"Request too large: {e}"})
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self._handle_request(line, writer, write_lock, admin))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass  # client went away, or the server is shutting down
+        finally:
+            writer.close()
+    
+    async def _authenticate(self, reader, writer, write_lock):
+        """
+        Check the connection's opening line; returns whether it may run admin
+        operations, or None if it was turned away
+        """
+        try:
+            hello = json.loads(await reader.readline())
+            token = hello.get('auth')
+            admin_token = hello.get('admin')
+        except (ValueError, AttributeError, asyncio.LimitOverrunError):
+            token = admin_token = None
+        
+        if self.token is not None and not _matches(token, self.token):
+            await self._respond(writer, write_lock, {'id': None, 'error': "Authentication failed"})
+            return None
+        admin = self.admin_token is not None and _matches(admin_token, self.admin_token)
+        await self._respond(writer, write_lock, {'id': None, 'result': {'admin': admin}})
+        return admin
+    
+    async def _handle_request(self, line, writer, write_lock, admin=False):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            op = request['op']
+            if op in ADMIN_OPERATIONS and not admin:
+                raise ValueError(f"{op} requires the admin token")
+            if op not in OPERATIONS and op not in ADMIN_OPERATIONS:
+                raise ValueError(f"Unknown operation: {op}")
+            method = getattr(self.db, op)
+            # Database calls block (file locks, fsync), so keep them off the event loop
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, lambda: method(*request.get('args', []), **request.get('kwargs', {}))
+            )
+            response = {'id': request_id, 'result': result}
+        except CorruptDataError as e:
+            # Clients re-raise this one rather than treating it as a failed call
+            response = {'id': request_id, 'error': str(e), 'corrupt': True}
+        except Exception as e:
+            response = {'id': request_id, 'error': str(e)}
+        
+        self.requests += 1
+        await self._respond(writer, write_lock, response)
+    
+    async def _respond(self, writer, write_lock, response):
+        async with write_lock:
+            writer.write((json.dumps(response, separators=(',', ':')) + "\n").encode('utf-8'))
+            await writer.drain()
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+def _matches(given, expected):
+    # Constant-time, so the token can't be guessed byte by byte from timings
+    return isinstance(given, str) and hmac.compare_digest(given.encode('utf-8'), expected.encode('utf-8'))
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the CYBERWOLF progress store to app nodes over TCP")
+    parser.add_argument("--host", default=os.getenv("CYBERWOLF_SERVER_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("CYBERWOLF_SERVER_PORT", "8765")))
+    parser.add_argument("--data-file", default="user_data.json")
+    args = parser.parse_args()
+    
+    try:
+        server = ProgressServer(Database(args.data_file), args.host, args.port)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Progress server listening on {args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
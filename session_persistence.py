@@ -0,0 +1,130 @@
+import threading
+
+import streamlit as st
+from streamlit.errors import StreamlitAPIException
+
+import metrics
+from persistence_queue import ASYNC_WRITES, get_queue
+
+# Fields of st.session_state that make up a user's stored progress
+PERSISTED_FIELDS = ('health_score', 'completed_challenges', 'current_challenge', 'user_score')
+
+_BASELINE_KEY = '_persisted_progress'
+_PENDING_KEY = '_persist_pending'
+
+# Process-wide counters: save requests from handlers, writes that actually
+# reached the database, and writes avoided because nothing had changed
+_stats = {'requested': 0, 'written': 0, 'skipped': 0}
+_stats_lock = threading.Lock()
+
+def _current_progress():
+    return {
+        'health_score': st.session_state.health_score,
+        'completed_challenges': sorted(st.session_state.completed_challenges),
+        'current_challenge': st.session_state.current_challenge,
+        'user_score': st.session_state.user_score
+    }
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+def mark_clean():
+    """
+    Record the session's progress as already stored (e.g. right after login)
+    """
+    st.session_state[_BASELINE_KEY] = _current_progress()
+    st.session_state[_PENDING_KEY] = False
+
+def mark_dirty():
+    """
+    Ask for the session's progress to be saved at the next flush
+    """
+    st.session_state[_PENDING_KEY] = True
+    _count('requested')
+
+def dirty_fields():
+    """
+    Persisted fields whose value differs from what was last stored
+    """
+    baseline = st.session_state.get(_BASELINE_KEY) or {}
+    current = _current_progress()
+    return [field for field in PERSISTED_FIELDS if baseline.get(field) != current[field]]
+
+def load(db, email):
+    """
+    A user's stored progress, including saves still queued for the background
+    writer, so logging back in right after logout never sees stale data
+    """
+    if ASYNC_WRITES:
+        queued = get_queue().get(db, email)
+        if queued is not None:
+            return queued
+    return db.get_user_data(email)
+
+def flush(db, wait=False):
+    """
+    Save the session's progress if a save was requested and something
+    actually changed; returns True when a write was made or queued. Saves go
+    through the background queue unless CYBERWOLF_DB_ASYNC_WRITES=0; `wait`
+    blocks until this user's progress is written, including saves queued by
+    earlier flushes (e.g. at logout).
+    """
+    saved = _flush(db)
+    email = st.session_state.get('user_email')
+    if wait and ASYNC_WRITES and email:
+        if not get_queue().wait_for(db, email, timeout=10.0):
+            print(f"Error saving progress: still queued for {email} after 10s")
+    return saved
+
+def _flush(db):
+    if not st.session_state.get(_PENDING_KEY) or not st.session_state.get('user_email'):
+        return False
+    
+    st.session_state[_PENDING_KEY] = False
+    if not dirty_fields():
+        _count('skipped')
+        return False
+    
+    progress = _current_progress()
+    if ASYNC_WRITES:
+        saved = get_queue().put(db, st.session_state.user_email, progress)
+    else:
+        saved = db.save_user_data(
+            st.session_state.user_email,
+            progress['health_score'],
+            progress['completed_challenges'],
+            progress['current_challenge'],
+            progress['user_score']
+        )
+    if not saved:
+        # Keep it pending so the next flush retries
+        st.session_state[_PENDING_KEY] = True
+        return False
+    
+    st.session_state[_BASELINE_KEY] = progress
+    _count('written')
+    return True
+
+def rerun(db):
+    """
+    Flush pending progress once, then rerun. The whole script only reruns when
+    progress changed, since the header and dashboard show it; otherwise just
+    the calling fragment (e.g. the challenge dialog) reruns.
+    """
+    changed = bool(st.session_state.get(_PENDING_KEY)) and bool(dirty_fields())
+    flush(db)
+    if changed:
+        st.rerun()
+    
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Not called from inside a fragment
+        st.rerun()
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+metrics.register_stats("progress_saves", get_stats)
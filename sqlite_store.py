@@ -0,0 +1,317 @@
+import argparse
+import json
+import os
+import sqlite3
+import threading
+
+from leaderboard_index import leaderboard_entry
+from user_record import UserRecord
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    health_score INTEGER NOT NULL,
+    completed_challenges TEXT NOT NULL,
+    completed_count INTEGER NOT NULL,
+    current_challenge INTEGER NOT NULL,
+    user_score INTEGER,
+    last_updated TEXT,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (id, version) VALUES (1, 0);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email);
+CREATE INDEX IF NOT EXISTS idx_users_leaderboard ON users (completed_count DESC, health_score DESC, id);
+"""
+
+UPSERT = """
+INSERT INTO users (email, health_score, completed_challenges, completed_count,
+                   current_challenge, user_score, last_updated, version)
+VALUES (?, ?, ?, ?, ?, ?, ?, (SELECT version FROM meta WHERE id = 1))
+ON CONFLICT (email) DO UPDATE SET
+    health_score = excluded.health_score,
+    completed_challenges = excluded.completed_challenges,
+    completed_count = excluded.completed_count,
+    current_challenge = excluded.current_challenge,
+    user_score = excluded.user_score,
+    last_updated = excluded.last_updated,
+    version = excluded.version
+"""
+
+UPDATE_EXISTING = """
+UPDATE users SET health_score = ?, completed_challenges = ?, completed_count = ?,
+                 current_challenge = ?, user_score = ?, last_updated = ?,
+                 version = (SELECT version FROM meta WHERE id = 1)
+WHERE email = ?
+"""
+
+# Stay under SQLite's default limit on bound parameters per statement
+MAX_IN_PARAMS = 500
+
+COLUMNS = "email, health_score, completed_challenges, current_challenge, user_score, last_updated"
+
+# Every write transaction bumps meta.version and stamps the rows it touches,
+# which lets readers in any process fetch just the rows changed since a version.
+BUMP_VERSION = "UPDATE meta SET version = version + 1 WHERE id = 1"
+
+class SqliteStore:
+    """
+    User records kept in a SQLite database in WAL mode, safe to share between
+    several Streamlit worker processes
+    """
+    def __init__(self, db_path="user_data.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._connect() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+            if columns and 'version' not in columns:
+                conn.execute("ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.executescript(SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_users_version ON users (version)")
+    
+    def _connect(self):
+        """
+        One connection per thread; Streamlit runs each session's script in its own thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def get(self, email):
+        row = self._connect().execute(
+            f"SELECT {COLUMNS} FROM users WHERE email = ?", (email,)
+        ).fetchone()
+        return _row_to_record(row)[1] if row else None
+    
+    def put(self, email, record):
+        with self._connect() as conn:
+            conn.execute(BUMP_VERSION)
+            conn.execute(UPSERT, _record_to_row(email, record))
+    
+    def replace(self, email, record):
+        """
+        Overwrite an existing user's record; returns False for unknown users
+        """
+        with self._connect() as conn:
+            conn.execute(BUMP_VERSION)
+            cursor = conn.execute(UPDATE_EXISTING, _record_to_row(email, record)[1:] + (email,))
+            return cursor.rowcount > 0
+    
+    def get_many(self, emails):
+        conn = self._connect()
+        result = {}
+        emails = list(emails)
+        for start in range(0, len(emails), MAX_IN_PARAMS):
+            chunk = emails[start:start + MAX_IN_PARAMS]
+            cursor = conn.execute(
+                f"SELECT {COLUMNS} FROM users WHERE email IN ({','.join('?' * len(chunk))})", chunk
+            )
+            result.update(_row_to_record(row) for row in cursor)
+        return result
+    
+    def replace_many(self, records):
+        """
+        Overwrite the existing users among (email, record) pairs in one
+        transaction; returns the emails that were replaced
+        """
+        records = list(records)
+        with self._connect() as conn:
+            # Take the write lock before checking, so a user another worker
+            # inserts meanwhile can't be missed
+            conn.execute("BEGIN IMMEDIATE")
+            existing = set(self.get_many([email for email, _ in records]))
+            rows = [_record_to_row(email, record)[1:] + (email,)
+                    for email, record in records if email in existing]
+            if rows:
+                conn.execute(BUMP_VERSION)
+                conn.executemany(UPDATE_EXISTING, rows)
+        return [email for email, _ in records if email in existing]
+    
+    def items(self):
+        cursor = self._connect().execute(f"SELECT {COLUMNS} FROM users ORDER BY id")
+        return [_row_to_record(row) for row in cursor]
+    
+    def changes_since(self, version):
+        """
+        Return (current_version, [(email, record), ...]) for rows written after
+        `version`, or (current_version, None) when a full reload is required
+        """
+        conn = self._connect()
+        with conn:
+            current = conn.execute("SELECT version FROM meta WHERE id = 1").fetchone()[0]
+            if version is None or version > current:
+                return current, None
+            cursor = conn.execute(
+                f"SELECT {COLUMNS} FROM users WHERE version > ? AND version <= ? ORDER BY version, id",
+                (version, current)
+            )
+            return current, [_row_to_record(row) for row in cursor]
+    
+    def iter_leaderboard(self, batch_size=1000):
+        """
+        Stream leaderboard rows straight off idx_users_leaderboard. A private
+        connection holds one read transaction, so the export is a consistent
+        snapshot even while other sessions keep writing.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            conn.execute("BEGIN")
+            cursor = conn.execute(
+                f"SELECT {COLUMNS} FROM users ORDER BY completed_count DESC, health_score DESC, id"
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield leaderboard_entry(*_row_to_record(row))
+        finally:
+            conn.close()
+    
+    def put_many(self, records, batch_size=None):
+        """
+        Upsert (email, record) pairs in batched transactions (a single
+        transaction when batch_size is None)
+        """
+        count = 0
+        batch = []
+        conn = self._connect()
+        for email, record in records:
+            batch.append(_record_to_row(email, record))
+            if batch_size and len(batch) >= batch_size:
+                with conn:
+                    conn.execute(BUMP_VERSION)
+                    conn.executemany(UPSERT, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.execute(BUMP_VERSION)
+                conn.executemany(UPSERT, batch)
+            count += len(batch)
+        return count
+
+def _record_to_row(email, record):
+    return (
+        email,
+        record.health_score if record.health_score is not None else 100,
+        json.dumps(record.completed_challenges),
+        record.completed_count,
+        record.current_challenge if record.current_challenge is not None else 1,
+        record.user_score,
+        record.last_updated,
+    )
+
+def _row_to_record(row):
+    email, health_score, completed, current_challenge, user_score, last_updated = row
+    return email, UserRecord.from_fields(health_score, json.loads(completed), current_challenge, user_score, last_updated)
+
+def iter_json_users(path, chunk_size=65536):
+    """
+    Stream (email, record) pairs out of a user_data.json object without
+    loading the whole document into memory
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = ""
+        pos = 0
+        eof = False
+        
+        def fill():
+            nonlocal buffer, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buffer = buffer[pos:] + chunk
+            pos = 0
+        
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return
+                fill()
+        
+        def decode():
+            nonlocal pos
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    # A number at the very end of the buffer may still be growing
+                    if end < len(buffer) or eof:
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                fill()
+        
+        def expect(char):
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buffer) or buffer[pos] != char:
+                raise ValueError(f"Malformed user data file: expected '{char}'")
+            pos += 1
+        
+        fill()
+        expect('{')
+        skip_whitespace()
+        if pos < len(buffer) and buffer[pos] == '}':
+            return
+        while True:
+            skip_whitespace()
+            email = decode()
+            expect(':')
+            skip_whitespace()
+            yield email, UserRecord.from_json(decode())
+            skip_whitespace()
+            if pos < len(buffer) and buffer[pos] == ',':
+                pos += 1
+                continue
+            expect('}')
+            return
+
+def iter_journal_users(path):
+    """
+    Yield (email, record) pairs from a JSON journal written in journal mode
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b"\n") or not line.strip():
+                continue
+            entry = json.loads(line)
+            yield entry['email'], UserRecord.from_json(entry['record'])
+
+def migrate_json(json_path="user_data.json", db_path="user_data.db", batch_size=1000):
+    """
+    Stream an existing user_data.json (plus its journal, if any) into SQLite
+    """
+    store = SqliteStore(db_path)
+    count = store.put_many(iter_json_users(json_path), batch_size)
+    count += store.put_many(iter_journal_users(json_path + ".log"), batch_size)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate user_data.json into the SQLite backend")
+    parser.add_argument("json_path", nargs="?", default="user_data.json")
+    parser.add_argument("db_path", nargs="?", default="user_data.db")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    
+    count = migrate_json(args.json_path, args.db_path, args.batch_size)
+    print(f"Migrated {count} records from {args.json_path} into {args.db_path}")
+
+if __name__ == "__main__":
+    main()
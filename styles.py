@@ -1,20 +1,27 @@
+import hashlib
+import json
+import re
+
 import streamlit as st
+import streamlit.components.v1 as components
 
-def apply_custom_styles():
-    """
-    Apply the cyberpunk/neon theme styles to the Streamlit app
-    """
-    st.markdown("""
-    <style>
-    /* Import Neo Brutalist fonts */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800;900&display=swap');
-    @import url('https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@400;700;800&display=swap');
-    
+# Theme fonts, still served by Google Fonts until the font files are vendored.
+# @import must lead the stylesheet; offline, Streamlit's bundled Source Sans /
+# Source Code Pro take over.
+FONT_IMPORTS = (
+    "@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;600;700;800;900&display=swap');"
+    "@import url('https://fonts.googleapis.com/css2?family=JetBrains+Mono:wght@400;700;800&display=swap');"
+)
+
+# Hash of the stylesheet already injected into this session's page
+_SESSION_KEY = '_stylesheet_hash'
+
+CUSTOM_CSS = """
     /* Global styles - Neo Brutalist Theme */
     .stApp {
         background-color: #f8f9fa !important;
         color: #000000 !important;
-        font-family: 'Inter', sans-serif !important;
+        font-family: 'Inter', 'Source Sans', sans-serif !important;
         font-weight: 600 !important;
     }
     
@@ -125,7 +132,7 @@ def apply_custom_styles():
         margin-bottom: 1rem;
         letter-spacing: -0.02em;
         text-transform: uppercase;
-        font-family: 'Inter', sans-serif;
+        font-family: 'Inter', 'Source Sans', sans-serif;
     }
     
     @keyframes brutalist-pulse {
@@ -212,7 +219,7 @@ def apply_custom_styles():
         font-weight: 900;
         color: #000000;
         text-shadow: 3px 3px 0px #ffc107;
-        font-family: 'JetBrains Mono', monospace;
+        font-family: 'JetBrains Mono', 'Source Code Pro', monospace;
     }
     
     /* Challenge containers - Neo Brutalist */
@@ -316,6 +323,37 @@ def apply_custom_styles():
         box-shadow: 4px 4px 0px #000000;
     }
     
+    /* Live leaderboard - Neo Brutalist */
+    .leaderboard-table {
+        width: 100%;
+        border-collapse: collapse;
+        background-color: #f8f9fa;
+        border: 6px solid #000000;
+        box-shadow: 8px 8px 0px #000000;
+        font-family: 'JetBrains Mono', 'Source Code Pro', monospace;
+    }
+    
+    .leaderboard-table th {
+        background-color: #000000;
+        color: #ffeb3b;
+        font-weight: 800;
+        text-transform: uppercase;
+        letter-spacing: 0.1em;
+        padding: 0.75rem 1rem;
+        text-align: left;
+    }
+    
+    .leaderboard-table td {
+        border-top: 3px solid #000000;
+        padding: 0.6rem 1rem;
+        font-weight: 700;
+        color: #000000;
+    }
+    
+    .leaderboard-table tr.podium td {
+        background-color: #ffeb3b;
+    }
+    
     /* Custom button styles - Neo Brutalist */
     .stButton > button {
         background-color: #ffeb3b;
@@ -323,7 +361,7 @@ def apply_custom_styles():
         border: 4px solid #000000;
         border-radius: 0;
         padding: 1rem 2rem;
-        font-family: 'Inter', sans-serif;
+        font-family: 'Inter', 'Source Sans', sans-serif;
         font-weight: 800;
         font-size: 1.1rem;
         transition: all 0.2s ease;
@@ -375,7 +413,7 @@ def apply_custom_styles():
         border: 4px solid #000000;
         border-radius: 0;
         color: #000000;
-        font-family: 'Inter', sans-serif;
+        font-family: 'Inter', 'Source Sans', sans-serif;
         font-weight: 600;
         padding: 1rem;
         box-shadow: 3px 3px 0px #000000;
@@ -466,7 +504,7 @@ def apply_custom_styles():
     .stError b {
         color: #000000 !important;
         font-weight: 800 !important;
-        font-family: 'Inter', sans-serif !important;
+        font-family: 'Inter', 'Source Sans', sans-serif !important;
     }
     
     /* Override any Streamlit default error styling */
@@ -633,14 +671,14 @@ def apply_custom_styles():
     
     /* Brutalist typography enhancements */
     h1, h2, h3, h4, h5, h6 {
-        font-family: 'Inter', sans-serif;
+        font-family: 'Inter', 'Source Sans', sans-serif;
         font-weight: 900;
         text-transform: uppercase;
         letter-spacing: -0.02em;
     }
     
     p, span, div {
-        font-family: 'Inter', sans-serif;
+        font-family: 'Inter', 'Source Sans', sans-serif;
         font-weight: 600;
     }
     
@@ -659,5 +697,53 @@ def apply_custom_styles():
         background: #ffc107;
         transform: skew(-15deg);
     }
-    </style>
-    """, unsafe_allow_html=True)
+"""
+
+def minify_css(css):
+    """
+    Drop comments and insignificant whitespace
+    """
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    # Not before ':' - "div :hover" and "div:hover" differ
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+@st.cache_resource
+def stylesheet():
+    """
+    Minified stylesheet and its content hash
+    """
+    css = FONT_IMPORTS + minify_css(CUSTOM_CSS)
+    return css, hashlib.sha256(css.encode('utf-8')).hexdigest()[:12]
+
+def apply_custom_styles():
+    """
+    Apply the cyberpunk/neon theme styles to the Streamlit app
+    """
+    css, digest = stylesheet()
+    if st.session_state.get(_SESSION_KEY) == digest:
+        # Already in this page's <head>; a <style> element would otherwise be
+        # re-sent on every rerun
+        return
+    
+    # The component iframe is same-origin, so it can place the stylesheet in the
+    # parent page's <head>, where it outlives the iframe itself
+    css_literal = json.dumps(css).replace("</", "<\\/")
+    components.html(f"""
+    <script>
+    const doc = window.parent.document;
+    let style = doc.getElementById("cyberwolf-styles");
+    if (!style) {{
+        style = doc.createElement("style");
+        style.id = "cyberwolf-styles";
+        doc.head.appendChild(style);
+    }}
+    if (style.dataset.hash !== {json.dumps(digest)}) {{
+        style.textContent = {css_literal};
+        style.dataset.hash = {json.dumps(digest)};
+    }}
+    </script>
+    """, height=0)
+    st.session_state[_SESSION_KEY] = digest
@@ -0,0 +1,65 @@
+import threading
+
+import streamlit as st
+
+import metrics
+import session_persistence
+
+SOLVE_POINTS = 5
+VIOLATION_PENALTY = 15
+
+# Process-wide counters: submissions by outcome, penalties for reopening a
+# solved challenge, and progress writes they caused. `writes` / `solved` is
+# the write volume per solve; rejected and repeated submissions write nothing.
+_stats = {'submitted': 0, 'solved': 0, 'rejected': 0, 'already_solved': 0, 'penalties': 0, 'writes': 0}
+_stats_lock = threading.Lock()
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+def _save(db):
+    session_persistence.mark_dirty()
+    if session_persistence.flush(db):
+        _count('writes')
+
+def submit(challenge_manager, challenge_num, values, db):
+    """
+    Validate a submission and apply a solve. Solving is idempotent: a
+    challenge already completed this session is neither rescored nor saved
+    again. Returns 'solved', 'rejected' or 'already_solved'.
+    """
+    _count('submitted')
+    if challenge_num in st.session_state.completed_challenges:
+        _count('already_solved')
+        return 'already_solved'
+    
+    if not challenge_manager.validate_submission(challenge_num, values):
+        _count('rejected')
+        return 'rejected'
+    
+    st.session_state.completed_challenges.add(challenge_num)
+    st.session_state.current_challenge = max(st.session_state.current_challenge, challenge_num + 1)
+    st.session_state.user_score += SOLVE_POINTS
+    db.record_event(st.session_state.user_email, 'solve', challenge_num)
+    
+    _count('solved')
+    _save(db)
+    return 'solved'
+
+def acknowledge_violation(challenge_num, db):
+    """
+    Penalize an attempt to redo a completed challenge; returns the new health score
+    """
+    st.session_state.health_score = max(0, st.session_state.health_score - VIOLATION_PENALTY)
+    db.record_event(st.session_state.user_email, 'penalty', challenge_num, VIOLATION_PENALTY)
+    
+    _count('penalties')
+    _save(db)
+    return st.session_state.health_score
+
+def get_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+metrics.register_stats("submissions", get_stats)
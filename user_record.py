@@ -0,0 +1,101 @@
+# Version 1 is the original per-user JSON object; version 2 is the compact
+# array form written today: [2, health_score, completed_mask, current_challenge,
+# user_score, last_updated]. Both are readable, so old files need no migration.
+SCHEMA_VERSION = 2
+
+class UnsupportedSchemaError(ValueError):
+    """
+    A record written in a schema version this code cannot read (i.e. by a
+    newer release); not damage, so no fallback should paper over it
+    """
+
+class UserRecord:
+    """
+    One user's stored progress. Completed challenges are kept as a bitmask
+    (bit n set = challenge n solved) instead of a list or set.
+    """
+    __slots__ = ('health_score', 'completed_mask', 'current_challenge', 'user_score', 'last_updated')
+    
+    def __init__(self, health_score=100, completed_mask=0, current_challenge=1, user_score=None, last_updated=None):
+        self.health_score = health_score
+        self.completed_mask = completed_mask
+        self.current_challenge = current_challenge
+        self.user_score = user_score
+        self.last_updated = last_updated
+    
+    @classmethod
+    def from_fields(cls, health_score, completed_challenges, current_challenge, user_score=None, last_updated=None):
+        return cls(health_score, challenges_to_mask(completed_challenges), current_challenge, user_score, last_updated)
+    
+    @classmethod
+    def from_json(cls, value):
+        """
+        Decode either schema version
+        """
+        if type(value) is list:
+            if value[0] != SCHEMA_VERSION:
+                raise UnsupportedSchemaError(f"Unsupported user record schema version: {value[0]}")
+            return cls(value[1], value[2], value[3], value[4], value[5])
+        
+        # Version 1: the original dict written by save_user_data/reset_user_progress
+        return cls(
+            value.get('health_score'),
+            challenges_to_mask(value.get('completed_challenges', [])),
+            value.get('current_challenge'),
+            value.get('user_score'),
+            value.get('last_updated')
+        )
+    
+    def to_json(self):
+        return [SCHEMA_VERSION, self.health_score, self.completed_mask, self.current_challenge,
+                self.user_score, self.last_updated]
+    
+    def to_dict(self):
+        """
+        The public dict shape returned by Database.get_user_data
+        """
+        data = {}
+        if self.health_score is not None:
+            data['health_score'] = self.health_score
+        data['completed_challenges'] = self.completed_challenges
+        if self.current_challenge is not None:
+            data['current_challenge'] = self.current_challenge
+        # Records written by reset_user_progress carry no user_score
+        if self.user_score is not None:
+            data['user_score'] = self.user_score
+        if self.last_updated is not None:
+            data['last_updated'] = self.last_updated
+        return data
+    
+    @property
+    def completed_challenges(self):
+        return mask_to_challenges(self.completed_mask)
+    
+    @property
+    def completed_count(self):
+        return self.completed_mask.bit_count()
+    
+    def __eq__(self, other):
+        if not isinstance(other, UserRecord):
+            return NotImplemented
+        return self.to_json() == other.to_json()
+    
+    def __repr__(self):
+        return (f"UserRecord(health_score={self.health_score!r}, completed={self.completed_challenges!r}, "
+                f"current_challenge={self.current_challenge!r}, user_score={self.user_score!r})")
+
+def challenges_to_mask(challenges):
+    mask = 0
+    for challenge_num in challenges:
+        mask |= 1 << challenge_num
+    return mask
+
+def mask_to_challenges(mask):
+    challenges = []
+    challenge_num = 0
+    while mask:
+        if mask & 1:
+            challenges.append(challenge_num)
+        mask >>= 1
+        challenge_num += 1
+    return challenges
@@ -1,15 +1,22 @@
 import os
-import google.generativeai as genai
 
 class WolfAI:
     def __init__(self):
         # Initialize Gemini client
         self.api_key = os.getenv("GEMINI_API_KEY")
-        if self.api_key:
+        self._model = None
+    
+    @property
+    def model(self):
+        """
+        Gemini model, created on first use: importing the SDK is slow and most
+        page loads never ask for a hint
+        """
+        if self._model is None and self.api_key:
+            import google.generativeai as genai
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-        else:
-            self.model = None
+            self._model = genai.GenerativeModel('gemini-1.5-flash')
+        return self._model
         
     def get_hint(self, challenge, challenge_num):
         """